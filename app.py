@@ -1,42 +1,73 @@
-from flask import Flask, jsonify, request, send_from_directory, g, stream_with_context, Response
+from flask import Flask, jsonify, request, send_from_directory, g, stream_with_context, Response, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from flask_compress import Compress
+from flask_caching import Cache
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.utils import safe_join
 from models import db, Bill, SavingsGoal, FinancialProfile, RiskProfile, Questionnaire, FinancialProduct, UserPreference, AIAdvice
 from services import FinancialService, AIAdviceService, ProductService
 from config import Config
 from datetime import datetime, date
-import json
+from functools import wraps
+from bisect import bisect_left
+import orjson
 import time
 
 import logging
+import mimetypes
 import traceback
 import re
 import os
+import socket
 from datetime import datetime
 
 # 导入自定义模块
 from utils import logger, validate_user_data
 from mpt_solver import MPTSolver
-from qwen_service import qwen_service
+from qwen_service import get_qwen_service
 
 
 # --- App Initialization ---
+class OrjsonProvider(DefaultJSONProvider):
+    """基于 orjson 的JSON编解码，所有 jsonify 调用均使用该实现"""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__, static_folder='static', static_url_path='')
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 service = AIAdviceService()
 db.init_app(app)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor-Date', 'X-Next-Cursor-Id'])
+Compress(app)
+cache = Cache(app)
 
 
 try:
     mpt_solver = MPTSolver()
     logger.info("MPT求解器初始化成功")
+    # 有效边界的输入固定不变，启动时在后台预先计算
+    mpt_solver.prewarm_efficient_frontier(num_portfolios=100)
 except Exception as e:
     logger.error(f"MPT求解器初始化失败: {str(e)}")
     mpt_solver = None
 
 
 # --- Database Creation ---
+def _has_rows(query):
+    """使用 EXISTS 检查是否存在记录，不加载ORM对象"""
+    return db.session.query(query.exists()).scalar()
+
 def init_db(app):
     """初始化数据库并创建默认数据"""
     with app.app_context():
@@ -46,498 +77,508 @@ def init_db(app):
         user_id = 'default_user'
         
         # 创建默认财务画像
-        if not FinancialProfile.query.filter_by(userId=user_id).first():
+        if not _has_rows(FinancialProfile.query.filter_by(userId=user_id)):
             profile = FinancialProfile(userId=user_id)
             db.session.add(profile)
         
         # 创建默认风险画像
-        if not RiskProfile.query.filter_by(userId=user_id).first():
+        if not _has_rows(RiskProfile.query.filter_by(userId=user_id)):
             risk_profile = RiskProfile(userId=user_id)
             db.session.add(risk_profile)
         
-        # 创建默认问卷
-        if not Questionnaire.query.first():
-            for key, questionnaire_data in Config.QUESTIONNAIRES.items():
-                questionnaire = Questionnaire(
-                    name=questionnaire_data['name'],
-                    description=questionnaire_data['description'],
-                    questions=questionnaire_data['questions'],
-                    type=key
-                )
-                db.session.add(questionnaire)
-        
-        # 创建默认理财产品
-        if not FinancialProduct.query.first():
-            for product_data in Config.DEFAULT_PRODUCTS:
-                product = FinancialProduct(**product_data)
-                db.session.add(product)
-        
+        # 创建默认问卷（批量插入）
+        if not _has_rows(Questionnaire.query):
+            db.session.execute(insert(Questionnaire), [
+                {
+                    'name': questionnaire_data['name'],
+                    'description': questionnaire_data['description'],
+                    'questions': questionnaire_data['questions'],
+                    'type': key
+                }
+                for key, questionnaire_data in Config.QUESTIONNAIRES.items()
+            ])
+
+        # 创建默认理财产品（批量插入）
+        if not _has_rows(FinancialProduct.query):
+            db.session.execute(insert(FinancialProduct), Config.DEFAULT_PRODUCTS)
+
+        # 所有默认数据在同一事务中提交
         db.session.commit()
 
 # --- Helper Functions ---
+# 账单列表分页参数
+BILLS_DEFAULT_LIMIT = 50
+BILLS_MAX_LIMIT = 500
+
+# 账单列表允许的排序字段
+BILL_SORT_COLUMNS = {
+    'date': Bill.date,
+    'amount': Bill.amount,
+    'category': Bill.category,
+    'type': Bill.type,
+}
+
 def get_user_id():
     """获取当前用户ID（实际项目中应该从认证系统获取）"""
     return 'default_user'
 
+def get_or_create_profile(model, user_id):
+    """获取用户画像，不存在时以 INSERT ... ON CONFLICT DO NOTHING 创建，并发的首次请求不会因唯一约束冲突失败"""
+    profile = model.query.filter_by(userId=user_id).first()
+    if profile is None:
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(model).on_conflict_do_nothing(index_elements=['userId'])
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(model).on_conflict_do_nothing(index_elements=['userId'])
+        else:
+            stmt = insert(model)
+        result = db.session.execute(stmt.values(userId=user_id))
+        db.session.commit()
+        if result.rowcount:
+            invalidate_cache('products')  # 推荐结果依赖用户画像，新建画像同样需要使缓存失效
+        profile = model.query.filter_by(userId=user_id).one()
+    return profile
+
+def cached_view_data(namespace, compute):
+    """缓存接口的计算结果，缓存键包含命名空间的失效版本号、用户、日期和请求参数"""
+    version = cache.get(f'{namespace}:version') or 0
+    key = f'{namespace}:{version}:{get_user_id()}:{date.today().isoformat()}:{request.full_path}'
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data)
+    return data
+
+def invalidate_cache(namespace):
+    """数据变动后递增命名空间的版本号，使其下所有缓存失效（Redis 下为原子的 INCR，并发写入不会丢失递增）"""
+    cache.cache.inc(f'{namespace}:version')
+
+def json_errors(status=500):
+    """统一处理视图中的未捕获异常：回滚会话并以JSON返回错误信息，替代每个视图中重复的 try/except"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            except Exception as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), status
+        return wrapper
+    return decorator
+
 # --- API Routes ---
 
 # 账单相关API
 @app.route('/api/bills', methods=['GET'])
+@json_errors()
 def get_bills():
     """获取账单列表"""
-    try:
-        query = Bill.query
-        
-        # 搜索
-        search_term = request.args.get('q')
-        if search_term:
-            query = query.filter(
-                Bill.note.ilike(f'%{search_term}%') | 
-                Bill.category.ilike(f'%{search_term}%')
-            )
-        
-        # 类型过滤
-        bill_type = request.args.get('type')
-        if bill_type and bill_type != 'all':
-            query = query.filter_by(type=bill_type)
-        
-        # 日期范围过滤
-        date_gte = request.args.get('date_gte')
-        if date_gte:
-            query = query.filter(Bill.date >= datetime.strptime(date_gte, '%Y-%m-%d').date())
-        
-        date_lte = request.args.get('date_lte')
-        if date_lte:
-            query = query.filter(Bill.date <= datetime.strptime(date_lte, '%Y-%m-%d').date())
-        
-        # 排序和分页
-        sort = request.args.get('sort', 'date')
-        order = request.args.get('order', 'desc')
-        limit = request.args.get('limit', type=int)
-        
+    query = Bill.query
+    
+    # 搜索
+    search_term = request.args.get('q')
+    if search_term:
+        query = query.filter(
+            Bill.note.ilike(f'%{search_term}%') | 
+            Bill.category.ilike(f'%{search_term}%')
+        )
+    
+    # 类型过滤
+    bill_type = request.args.get('type')
+    if bill_type and bill_type != 'all':
+        query = query.filter_by(type=bill_type)
+    
+    # 日期范围过滤
+    date_gte = request.args.get('date_gte')
+    if date_gte:
+        query = query.filter(Bill.date >= date.fromisoformat(date_gte))
+    
+    date_lte = request.args.get('date_lte')
+    if date_lte:
+        query = query.filter(Bill.date <= date.fromisoformat(date_lte))
+    
+    # 排序和分页
+    sort = request.args.get('sort', 'date')
+    if sort not in BILL_SORT_COLUMNS:
+        sort = 'date'
+    sort_column = BILL_SORT_COLUMNS[sort]
+    order = request.args.get('order', 'desc')
+    limit = request.args.get('limit', BILLS_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, BILLS_MAX_LIMIT))
+
+    # 按日期排序时支持游标分页：(date, id) 组合严格在上一页最后一条之后
+    keyset = sort == 'date'
+    cursor_date = request.args.get('cursor_date')
+    cursor_id = request.args.get('cursor_id', type=int)
+    if keyset and cursor_date and cursor_id is not None:
+        cursor = (date.fromisoformat(cursor_date), cursor_id)
         if order == 'desc':
-            query = query.order_by(getattr(Bill, sort).desc())
+            query = query.filter(tuple_(Bill.date, Bill.id) < cursor)
         else:
-            query = query.order_by(getattr(Bill, sort).asc())
-        
-        if limit:
-            query = query.limit(limit)
-        
-        bills = query.all()
-        return jsonify([bill.to_dict() for bill in bills])
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            query = query.filter(tuple_(Bill.date, Bill.id) > cursor)
+
+    # 以 id 作为次级排序，保证分页顺序稳定
+    if order == 'desc':
+        query = query.order_by(sort_column.desc(), Bill.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Bill.id.asc())
+
+    bills = Bill.dicts_for_query(query.limit(limit))
+    response = jsonify(bills)
+
+    # 本页已满时返回下一页游标
+    if keyset and len(bills) == limit:
+        response.headers['X-Next-Cursor-Date'] = bills[-1]['date'].isoformat()
+        response.headers['X-Next-Cursor-Id'] = str(bills[-1]['id'])
+    return response
+
+def bill_values(data):
+    """从请求数据中取出账单字段"""
+    return {
+        'type': data['type'],
+        'amount': float(data['amount']),
+        'category': data['category'],
+        'date': date.fromisoformat(data['date']),
+        'note': data.get('note', '')
+    }
 
 @app.route('/api/bills', methods=['POST'])
+@json_errors(400)
 def add_bill():
-    """添加账单"""
-    try:
-        data = request.json
-        
-        new_bill = Bill(
-            type=data['type'],
-            amount=float(data['amount']),
-            category=data['category'],
-            date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
-            note=data.get('note', '')
-        )
-        
-        db.session.add(new_bill)
+    """添加账单（请求体为数组时批量添加）"""
+    data = request.json
+    
+    if isinstance(data, list):
+        # 批量添加：全部账单在一次 flush 中批量插入（自增 id 与时间戳由 RETURNING 取回），同一事务一次提交
+        bills = [Bill(**bill_values(item)) for item in data]
+        db.session.add_all(bills)
+        db.session.flush()
+        result = [bill.to_dict() for bill in bills]
         db.session.commit()
-        
-        return jsonify(new_bill.to_dict()), 201
+        invalidate_cache('analytics')
+        return jsonify(result), 201
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    new_bill = Bill(**bill_values(data))
+    
+    db.session.add(new_bill)
+    db.session.commit()
+    invalidate_cache('analytics')
+    
+    return jsonify(new_bill.to_dict()), 201
 
 @app.route('/api/bills/<int:id>', methods=['PUT'])
+@json_errors(400)
 def update_bill(id):
     """更新账单"""
-    try:
-        bill = Bill.query.get_or_404(id)
-        data = request.json
-        
-        bill.type = data['type']
-        bill.amount = float(data['amount'])
-        bill.category = data['category']
-        bill.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        bill.note = data.get('note', '')
-        
-        db.session.commit()
-        return jsonify(bill.to_dict())
+    bill = db.session.get(Bill, id)
+    if bill is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    data = request.json
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    bill.type = data['type']
+    bill.amount = float(data['amount'])
+    bill.category = data['category']
+    bill.date = date.fromisoformat(data['date'])
+    bill.note = data.get('note', '')
+    
+    db.session.commit()
+    invalidate_cache('analytics')
+    return jsonify(bill.to_dict())
 
 @app.route('/api/bills/<int:id>', methods=['DELETE'])
+@json_errors()
 def delete_bill(id):
     """删除账单"""
-    try:
-        bill = Bill.query.get_or_404(id)
-        db.session.delete(bill)
-        db.session.commit()
-        return jsonify({'message': 'Bill deleted successfully'})
-    
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    bill = db.session.get(Bill, id)
+    if bill is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    db.session.delete(bill)
+    db.session.commit()
+    invalidate_cache('analytics')
+    return jsonify({'message': 'Bill deleted successfully'})
 
 # 储蓄目标相关API
 @app.route('/api/savings-goals', methods=['GET'])
+@json_errors()
 def get_savings_goals():
     """获取储蓄目标列表"""
-    try:
-        limit = request.args.get('limit', type=int)
-        query = SavingsGoal.query.order_by(SavingsGoal.createdAt.desc())
-        
-        if limit:
-            query = query.limit(limit)
-        
-        goals = query.all()
-        return jsonify([goal.to_dict() for goal in goals])
+    limit = request.args.get('limit', type=int)
+    query = SavingsGoal.query.order_by(SavingsGoal.createdAt.desc())
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    if limit:
+        query = query.limit(limit)
+    
+    return jsonify(SavingsGoal.dicts_for_query(query))
 
 @app.route('/api/savings-goals', methods=['POST'])
+@json_errors(400)
 def add_savings_goal():
     """添加储蓄目标"""
-    try:
-        data = request.json
-        
-        new_goal = SavingsGoal(
-            name=data['name'],
-            targetAmount=float(data['targetAmount']),
-            currentAmount=float(data.get('currentAmount', 0)),
-            targetDate=datetime.strptime(data['targetDate'], '%Y-%m-%d').date() if data.get('targetDate') else None,
-            type=data['type']
-        )
-        
-        db.session.add(new_goal)
-        db.session.commit()
-        
-        return jsonify(new_goal.to_dict()), 201
+    data = request.json
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    new_goal = SavingsGoal(
+        name=data['name'],
+        targetAmount=float(data['targetAmount']),
+        currentAmount=float(data.get('currentAmount', 0)),
+        targetDate=date.fromisoformat(data['targetDate']) if data.get('targetDate') else None,
+        type=data['type']
+    )
+    
+    db.session.add(new_goal)
+    db.session.commit()
+    invalidate_cache('analytics')
+    
+    return jsonify(new_goal.to_dict()), 201
 
 @app.route('/api/savings-goals/<int:id>', methods=['DELETE'])
+@json_errors()
 def delete_savings_goal(id):
     """删除储蓄目标"""
-    try:
-        goal = SavingsGoal.query.get_or_404(id)
-        db.session.delete(goal)
-        db.session.commit()
-        return jsonify({'message': 'Goal deleted successfully'})
-    
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    goal = db.session.get(SavingsGoal, id)
+    if goal is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    db.session.delete(goal)
+    db.session.commit()
+    invalidate_cache('analytics')
+    return jsonify({'message': 'Goal deleted successfully'})
 
 @app.route('/api/savings-goals/<int:id>/add-savings', methods=['POST'])
+@json_errors(400)
 def add_savings_to_goal(id):
     """向储蓄目标添加金额"""
-    try:
-        goal = SavingsGoal.query.get_or_404(id)
-        data = request.json
-        amount = float(data.get('amount', 0))
-        
-        if amount > 0:
-            goal.currentAmount = min(goal.currentAmount + amount, goal.targetAmount)
-            db.session.commit()
-        
-        return jsonify(goal.to_dict())
+    data = request.json
+    amount = float(data.get('amount', 0))
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    # 金额无效时直接返回，无需查询数据库
+    if amount <= 0:
+        return jsonify({'error': 'Amount must be positive'}), 400
+    
+    goal = db.session.get(SavingsGoal, id)
+    if goal is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    
+    goal.currentAmount = min(goal.currentAmount + amount, goal.targetAmount)
+    db.session.commit()
+    invalidate_cache('analytics')
+    
+    return jsonify(goal.to_dict())
 
 # 仪表盘和分析API
 @app.route('/api/dashboard-summary', methods=['GET'])
+@json_errors()
 def get_dashboard_summary():
     """获取仪表盘摘要"""
-    try:
-        user_id = get_user_id()
-        data = FinancialService.get_dashboard_summary(user_id)
-        return jsonify(data)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    user_id = get_user_id()
+    data = cached_view_data('analytics', lambda: FinancialService.get_dashboard_summary(user_id))
+    return jsonify(data)
 
 @app.route('/api/analysis/trends', methods=['GET'])
+@json_errors()
 def get_analysis_trends():
     """获取分析趋势数据"""
-    try:
-        period = request.args.get('period', 'month')
-        user_id = get_user_id()
-        data = FinancialService.get_analysis_trends(period, user_id)
-        return jsonify(data)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    period = request.args.get('period', 'month')
+    user_id = get_user_id()
+    data = cached_view_data('analytics', lambda: FinancialService.get_analysis_trends(period, user_id))
+    return jsonify(data)
 
 @app.route('/api/analysis/expense-pie', methods=['GET'])
+@json_errors()
 def get_expense_pie():
     """获取支出饼图数据"""
-    try:
-        user_id = get_user_id()
-        data = FinancialService.get_expense_pie(user_id)
-        return jsonify(data)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    user_id = get_user_id()
+    data = cached_view_data('analytics', lambda: FinancialService.get_expense_pie(user_id))
+    return jsonify(data)
 
 @app.route('/api/savings-stats', methods=['GET'])
+@json_errors()
 def get_savings_stats():
     """获取储蓄统计"""
-    try:
-        user_id = get_user_id()
-        data = FinancialService.get_savings_stats(user_id)
-        return jsonify(data)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    user_id = get_user_id()
+    data = cached_view_data('analytics', lambda: FinancialService.get_savings_stats(user_id))
+    return jsonify(data)
 
 # 用户画像相关API
 @app.route('/api/financial-profile', methods=['GET'])
+@json_errors()
 def get_financial_profile():
     """获取财务画像"""
-    try:
-        user_id = get_user_id()
-        profile = FinancialProfile.query.filter_by(userId=user_id).first()
-        
-        if not profile:
-            profile = FinancialProfile(userId=user_id)
-            db.session.add(profile)
-            db.session.commit()
-        
-        return jsonify(profile.to_dict())
+    user_id = get_user_id()
+    profile = get_or_create_profile(FinancialProfile, user_id)
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return jsonify(profile.to_dict())
 
 @app.route('/api/financial-profile', methods=['POST'])
+@json_errors(400)
 def update_financial_profile():
     """更新财务画像"""
-    try:
-        user_id = get_user_id()
-        profile = FinancialProfile.query.filter_by(userId=user_id).first()
-        
-        if not profile:
-            profile = FinancialProfile(userId=user_id)
-            db.session.add(profile)
-        
-        data = request.json
-        profile.assetLiabilityRatio = data.get('assetLiabilityRatio', profile.assetLiabilityRatio)
-        profile.debtIncomeRatio = data.get('debtIncomeRatio', profile.debtIncomeRatio)
-        profile.surplusRatio = data.get('surplusRatio', profile.surplusRatio)
-        profile.liquidityRatio = data.get('liquidityRatio', profile.liquidityRatio)
-        profile.type = data.get('type', profile.type)
-        
-        db.session.commit()
-        return jsonify(profile.to_dict())
+    user_id = get_user_id()
+    profile = get_or_create_profile(FinancialProfile, user_id)
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    data = request.json
+    profile.assetLiabilityRatio = data.get('assetLiabilityRatio', profile.assetLiabilityRatio)
+    profile.debtIncomeRatio = data.get('debtIncomeRatio', profile.debtIncomeRatio)
+    profile.surplusRatio = data.get('surplusRatio', profile.surplusRatio)
+    profile.liquidityRatio = data.get('liquidityRatio', profile.liquidityRatio)
+    profile.type = data.get('type', profile.type)
+    
+    db.session.commit()
+    return jsonify(profile.to_dict())
 
 @app.route('/api/risk-profile', methods=['GET'])
+@json_errors()
 def get_risk_profile():
     """获取风险画像"""
-    try:
-        user_id = get_user_id()
-        profile = RiskProfile.query.filter_by(userId=user_id).first()
-        
-        if not profile:
-            profile = RiskProfile(userId=user_id)
-            db.session.add(profile)
-            db.session.commit()
-        
-        return jsonify(profile.to_dict())
+    user_id = get_user_id()
+    profile = get_or_create_profile(RiskProfile, user_id)
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return jsonify(profile.to_dict())
 
 @app.route('/api/risk-profile', methods=['POST'])
+@json_errors(400)
 def update_risk_profile():
     """更新风险画像"""
-    try:
-        user_id = get_user_id()
-        profile = RiskProfile.query.filter_by(userId=user_id).first()
-        
-        if not profile:
-            profile = RiskProfile(userId=user_id)
-            db.session.add(profile)
-        
-        data = request.json
-        profile.score = data.get('score', profile.score)
-        profile.answers = data.get('answers', profile.answers)
-        profile.riskLevel = data.get('riskLevel', profile.riskLevel)
-        profile.timestamp = datetime.now()
-        
-        db.session.commit()
-        return jsonify(profile.to_dict())
+    user_id = get_user_id()
+    profile = get_or_create_profile(RiskProfile, user_id)
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    data = request.json
+    profile.score = data.get('score', profile.score)
+    profile.answers = data.get('answers', profile.answers)
+    profile.riskLevel = data.get('riskLevel', profile.riskLevel)
+    profile.timestamp = func.now()  # 由数据库生成时间戳
+    
+    db.session.commit()
+    invalidate_cache('products')  # 推荐结果依赖产品列表和风险等级
+    return jsonify(profile.to_dict())
 
 # 问卷相关API
 @app.route('/api/questionnaires', methods=['GET'])
+@json_errors()
 def get_questionnaires():
     """获取问卷列表"""
-    try:
-        questionnaires = Questionnaire.query.filter_by(isActive=True).all()
-        return jsonify([q.to_dict() for q in questionnaires])
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    data = cached_view_data('questionnaires', lambda: [
+        q.to_dict() for q in Questionnaire.query.filter_by(isActive=True).all()
+    ])
+    return jsonify(data)
 
 @app.route('/api/questionnaires/<int:id>', methods=['GET'])
+@json_errors()
 def get_questionnaire(id):
     """获取单个问卷详情"""
-    try:
-        questionnaire = Questionnaire.query.get_or_404(id)
-        return jsonify(questionnaire.to_dict())
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    def load():
+        questionnaire = db.session.get(Questionnaire, id)
+        return questionnaire.to_dict() if questionnaire else None
+
+    # 问卷只在初始化数据库时写入，没有接口会使 'questionnaires' 命名空间失效，
+    # 直接修改数据库后，缓存最长在 CACHE_DEFAULT_TIMEOUT 秒后才会更新
+    data = cached_view_data('questionnaires', load)
+    if data is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    return jsonify(data)
 
 # 理财产品相关API
 @app.route('/api/financial-products', methods=['GET'])
+@json_errors()
 def get_financial_products():
     """获取理财产品列表"""
-    try:
-        user_id = get_user_id()
-        products = ProductService.get_recommended_products(user_id)
-        return jsonify(products)
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    user_id = get_user_id()
+    products = cached_view_data('products', lambda: ProductService.get_recommended_products(user_id))
+    return jsonify(products)
 
 @app.route('/api/financial-products/search', methods=['GET'])
+@json_errors()
 def search_financial_products():
     """搜索理财产品"""
-    try:
-        query = request.args.get('q', '')
-        product_type = request.args.get('type')
-        risk_level = request.args.get('risk')
-        limit = request.args.get('limit', 20, type=int)
-        
-        products = ProductService.search_products(query, product_type, risk_level, limit)
-        return jsonify(products)
+    query = request.args.get('q', '')
+    product_type = request.args.get('type')
+    risk_level = request.args.get('risk')
+    limit = request.args.get('limit', 20, type=int)
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    products = cached_view_data('products', lambda: ProductService.search_products(query, product_type, risk_level, limit))
+    return jsonify(products)
 
 @app.route('/api/financial-products', methods=['POST'])
+@json_errors(400)
 def add_financial_product():
     """添加理财产品（管理员功能）"""
-    try:
-        data = request.json
-        
-        product = FinancialProduct(
-            name=data['name'],
-            description=data.get('description', ''),
-            productType=data['productType'],
-            riskLevel=data.get('riskLevel', 'low'),
-            expectedReturn=float(data.get('expectedReturn', 0)),
-            minInvestment=float(data.get('minInvestment', 0)),
-            investmentPeriod=data.get('investmentPeriod', ''),
-            features=data.get('features', {}),
-            tags=data.get('tags', [])
-        )
-        
-        db.session.add(product)
-        db.session.commit()
-        
-        return jsonify(product.to_dict()), 201
+    data = request.json
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
+    product = FinancialProduct(
+        name=data['name'],
+        description=data.get('description', ''),
+        productType=data['productType'],
+        riskLevel=data.get('riskLevel', 'low'),
+        expectedReturn=float(data.get('expectedReturn', 0)),
+        minInvestment=float(data.get('minInvestment', 0)),
+        investmentPeriod=data.get('investmentPeriod', ''),
+        features=data.get('features', {}),
+        tags=data.get('tags', [])
+    )
+    
+    db.session.add(product)
+    db.session.commit()
+    invalidate_cache('products')
+    
+    return jsonify(product.to_dict()), 201
 
 @app.route('/api/financial-products/<int:id>', methods=['PUT'])
+@json_errors(400)
 def update_financial_product(id):
     """更新理财产品（管理员功能）"""
-    try:
-        product = FinancialProduct.query.get_or_404(id)
-        data = request.json
-        
-        product.name = data.get('name', product.name)
-        product.description = data.get('description', product.description)
-        product.productType = data.get('productType', product.productType)
-        product.riskLevel = data.get('riskLevel', product.riskLevel)
-        product.expectedReturn = float(data.get('expectedReturn', product.expectedReturn))
-        product.minInvestment = float(data.get('minInvestment', product.minInvestment))
-        product.investmentPeriod = data.get('investmentPeriod', product.investmentPeriod)
-        product.features = data.get('features', product.features)
-        product.tags = data.get('tags', product.tags)
-        product.isActive = data.get('isActive', product.isActive)
-        
-        db.session.commit()
-        return jsonify(product.to_dict())
+    product = db.session.get(FinancialProduct, id)
+    if product is None:
+        return jsonify({'error': 'Resource not found'}), 404
+    data = request.json
     
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 400
-
-@app.route('/api/ai-advice/financial', methods=['GET'])
-def get_financial_advice_stream():
-    """获取财务建议（流式传输）"""
-    try:
-        user_id = get_user_id()
-        service = AIAdviceService()
-        
-        def generate():
-            try:
-                for chunk in service.generate_financial_advice_stream(user_id):
-                    # 发送数据块
-                    yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
-                
-                # 发送结束信号
-                yield f"data: {json.dumps({'type': 'done', 'content': ''})}\n\n"
-                
-            except Exception as e:
-                # 发送错误信号
-                yield f"data: {json.dumps({'type': 'error', 'content': f'生成失败: {str(e)}'})}\n\n"
-        
-        return Response(
-            stream_with_context(generate()),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
-        )
+    product.name = data.get('name', product.name)
+    product.description = data.get('description', product.description)
+    product.productType = data.get('productType', product.productType)
+    product.riskLevel = data.get('riskLevel', product.riskLevel)
+    product.expectedReturn = float(data.get('expectedReturn', product.expectedReturn))
+    product.minInvestment = float(data.get('minInvestment', product.minInvestment))
+    product.investmentPeriod = data.get('investmentPeriod', product.investmentPeriod)
+    product.features = data.get('features', product.features)
+    product.tags = data.get('tags', product.tags)
+    product.isActive = data.get('isActive', product.isActive)
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/ai-advice/investment', methods=['GET'])
-def get_investment_advice_stream():
-    """获取投资建议（流式传输）"""
+    db.session.commit()
+    invalidate_cache('products')
+    return jsonify(product.to_dict())
+
+# SSE 帧的固定部分预先编码，每个数据块只需序列化内容本身
+_SSE_CONTENT_PREFIX = b'data: {"type":"content","content":'
+_SSE_ERROR_PREFIX = b'data: {"type":"error","content":'
+_SSE_SUFFIX_OBJECT = b'}\n\n'
+_SSE_DONE = b'data: {"type":"done","content":""}\n\n'
+
+def disable_nagle():
+    """关闭当前连接的 Nagle 算法，让SSE小数据帧立即发出（gunicorn 监听套接字已默认设置）"""
+    sock = request.environ.get('werkzeug.socket')
+    if sock is None:
+        return
     try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+
+def make_advice_stream_view(generate_advice):
+    """根据建议生成方法构建流式传输视图，两个AI建议接口共用同一套SSE处理逻辑"""
+    def view():
         user_id = get_user_id()
-        service = AIAdviceService()
+        disable_nagle()
         
         def generate():
             try:
-                for chunk in service.generate_financial_advice_stream(user_id):
+                for chunk in generate_advice(user_id):
                     # 发送数据块
-                    yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
+                    yield _SSE_CONTENT_PREFIX + orjson.dumps(chunk) + _SSE_SUFFIX_OBJECT
                 
                 # 发送结束信号
-                yield f"data: {json.dumps({'type': 'done', 'content': ''})}\n\n"
+                yield _SSE_DONE
                 
             except Exception as e:
                 # 发送错误信号
-                yield f"data: {json.dumps({'type': 'error', 'content': f'生成失败: {str(e)}'})}\n\n"
+                yield _SSE_ERROR_PREFIX + orjson.dumps(f'生成失败: {str(e)}') + _SSE_SUFFIX_OBJECT
         
         return Response(
             stream_with_context(generate()),
@@ -549,50 +590,84 @@ def get_investment_advice_stream():
             }
         )
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return json_errors()(view)
+
+# 获取财务建议（流式传输）
+app.add_url_rule('/api/ai-advice/financial', 'get_financial_advice_stream',
+                 make_advice_stream_view(service.generate_financial_advice_stream), methods=['GET'])
+
+# 获取投资建议（流式传输）
+app.add_url_rule('/api/ai-advice/investment', 'get_investment_advice_stream',
+                 make_advice_stream_view(service.generate_investment_advice_stream), methods=['GET'])
 
 @app.route('/api/ai-advice', methods=['GET'])
+@json_errors()
 def get_ai_advice_history():
     """获取AI建议历史"""
-    try:
-        user_id = get_user_id()
-        limit = request.args.get('limit', 10, type=int)
-        
-        advice_list = AIAdvice.query.filter_by(userId=user_id)\
-            .order_by(AIAdvice.createdAt.desc())\
-            .limit(limit).all()
-        
-        return jsonify([advice.to_dict() for advice in advice_list])
+    user_id = get_user_id()
+    limit = request.args.get('limit', 10, type=int)
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # 只查询返回所需的列，不构建ORM对象
+    rows = db.session.execute(
+        select(
+            AIAdvice.id, AIAdvice.userId, AIAdvice.adviceType, AIAdvice.content,
+            AIAdvice.context, AIAdvice.isRead, AIAdvice.createdAt
+        ).where(AIAdvice.userId == user_id)
+        .order_by(AIAdvice.createdAt.desc())
+        .limit(limit)
+    ).all()
+    
+    # createdAt 由 orjson 直接序列化为 ISO 格式
+    return jsonify([dict(row._mapping) for row in rows])
 
 # 配置相关API
+# 配置数据在运行期间不会变化，启动时序列化一次即可
+_CONFIG_JSON = app.json.dumps({
+    'categories': Config.CATEGORIES,
+    'savingsGoalTypes': Config.SAVINGS_GOAL_TYPES,
+    'riskLevels': Config.RISK_LEVELS,
+    'productTypes': Config.PRODUCT_TYPES
+})
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """获取应用配置"""
-    try:
-        return jsonify({
-            'categories': Config.CATEGORIES,
-            'savingsGoalTypes': Config.SAVINGS_GOAL_TYPES,
-            'riskLevels': Config.RISK_LEVELS,
-            'productTypes': Config.PRODUCT_TYPES
-        })
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return app.response_class(_CONFIG_JSON, mimetype='application/json')
 
 # 静态文件服务
+# 页面和脚本文件名不带版本号，每次都需通过 ETag 协商（未修改时返回 304）；resources/ 下的资源长期缓存
+STATIC_REVALIDATE_CACHE_CONTROL = 'no-cache'
+STATIC_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def send_static(filename):
+    """发送静态文件；配置了 X-Accel-Redirect 前缀时交由 nginx 直接发送文件"""
+    accel_prefix = app.config.get('STATIC_ACCEL_REDIRECT_PREFIX')
+    if not accel_prefix:
+        response = send_from_directory(app.static_folder, filename, conditional=True)
+    else:
+        accel_path = safe_join(accel_prefix, filename)
+        if accel_path is None:
+            abort(404)
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = accel_path
+
+    response.headers['Cache-Control'] = (
+        STATIC_IMMUTABLE_CACHE_CONTROL if filename.startswith('resources/') else STATIC_REVALIDATE_CACHE_CONTROL
+    )
+    return response
+
+# static_url_path 为空时 Flask 内置的静态路由会优先匹配文件路径，同样经由 send_static 发送
+app.view_functions['static'] = send_static
+
 @app.route('/')
 def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_static('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
     if path.endswith('.html') or path.endswith('.js') or path.startswith('resources/'):
-        return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, 'index.html')
+        return send_static(path)
+    return send_static('index.html')
 
 # --- Error Handlers ---
 @app.errorhandler(404)
@@ -604,6 +679,17 @@ def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
+# clean_qwen_response 使用的正则，模块加载时编译一次
+_MD_HEADING_RE = re.compile(r'^\s*#+\s*', re.MULTILINE)
+_MD_BOLD_STAR_RE = re.compile(r'\*\*(.*?)\*\*')
+_MD_BOLD_UNDERSCORE_RE = re.compile(r'__(.*?)__')
+_MD_ITALIC_STAR_RE = re.compile(r'\*(.*?)\*')
+_MD_ITALIC_UNDERSCORE_RE = re.compile(r'_(.*?)_')
+_MD_CODE_RE = re.compile(r'`(.*?)`')
+_MD_BULLET_RE = re.compile(r'^\s*[-*+]\s+', re.MULTILINE)
+_MD_ORDERED_RE = re.compile(r'^\s*\d+\.\s*', re.MULTILINE)
+_MD_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+
 def clean_qwen_response(text: str) -> str:
     """
     后端备用清理函数，确保移除所有Markdown格式标记
@@ -612,23 +698,23 @@ def clean_qwen_response(text: str) -> str:
         return text
 
     # 移除 Markdown 标题标记
-    text = re.sub(r'^\s*#+\s*', '', text, flags=re.MULTILINE)
+    text = _MD_HEADING_RE.sub('', text)
 
     # 移除 Markdown 粗体和斜体标记
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    text = re.sub(r'__(.*?)__', r'\1', text)
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-    text = re.sub(r'_(.*?)_', r'\1', text)
+    text = _MD_BOLD_STAR_RE.sub(r'\1', text)
+    text = _MD_BOLD_UNDERSCORE_RE.sub(r'\1', text)
+    text = _MD_ITALIC_STAR_RE.sub(r'\1', text)
+    text = _MD_ITALIC_UNDERSCORE_RE.sub(r'\1', text)
 
     # 移除代码标记
-    text = re.sub(r'`(.*?)`', r'\1', text)
+    text = _MD_CODE_RE.sub(r'\1', text)
 
     # 移除列表标记
-    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*\d+\.\s*', '', text, flags=re.MULTILINE)
+    text = _MD_BULLET_RE.sub('', text)
+    text = _MD_ORDERED_RE.sub('', text)
 
     # 移除多余的空行
-    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = _MD_BLANK_LINES_RE.sub('\n\n', text)
 
     return text.strip()
 
@@ -641,6 +727,10 @@ def health_check():
         'mpt_solver_status': 'initialized' if mpt_solver else 'failed'
     })
 
+# 风险评分分档：≤3 保守型，≤7 稳健型，其余为积极型
+RISK_LEVEL_BOUNDS = (3, 7)
+RISK_LEVEL_NAMES = ('保守型', '稳健型', '积极型')
+
 @app.route('/api/invest/recommend', methods=['POST'])
 def get_investment_recommendation():
     """
@@ -696,7 +786,7 @@ def get_investment_recommendation():
         # 计算有效边界
         logger.info("开始计算投资组合有效边界")
         try:
-            efficient_frontier = mpt_solver.calculate_efficient_frontier(num_portfolios=100)
+            efficient_frontier = mpt_solver.get_efficient_frontier(num_portfolios=100)
             logger.info(f"有效边界计算完成，生成 {len(efficient_frontier)} 个有效组合")
         except Exception as e:
             error_msg = f"投资组合优化计算失败: {str(e)}"
@@ -745,6 +835,7 @@ def get_investment_recommendation():
 
         # 生成Qwen解释文本
         logger.info("开始生成投资组合专业解释")
+        qwen_service = get_qwen_service()
         try:
             qwen_explanation = qwen_service.generate_explanation(
                 formatted_portfolio,
@@ -770,9 +861,10 @@ def get_investment_recommendation():
             qwen_explanation = cleaned_qwen_explanation
 
         # 构建最终返回结果
+        end_time = datetime.now()
         result = {
             'success': True,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': end_time.isoformat(),
             'data': {
                 # 投资组合购买计划
                 'the_plan': {
@@ -796,8 +888,7 @@ def get_investment_recommendation():
                 # 用户画像信息（用于前端显示）
                 'user_profile': {
                     'risk_score': validated_user_data['risk_score'],
-                    'risk_level': "保守型" if validated_user_data['risk_score'] <= 3 else
-                                 ("稳健型" if validated_user_data['risk_score'] <= 7 else "积极型"),
+                    'risk_level': RISK_LEVEL_NAMES[bisect_left(RISK_LEVEL_BOUNDS, validated_user_data['risk_score'])],
                     'age': validated_user_data['age'],
                     'investment_horizon': validated_user_data['investment_horizon']
                 }
@@ -805,7 +896,6 @@ def get_investment_recommendation():
         }
 
         # 记录处理完成信息
-        end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
 
         logger.info("=== 投资推荐请求成功完成 ===")
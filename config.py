@@ -1,13 +1,47 @@
 import os
+import orjson
 from datetime import datetime
 from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+# 布尔型环境变量视为真的取值
+_TRUTHY = frozenset(('true', '1', 'yes', 'on'))
+
+
+def _json_column_dumps(obj):
+    """JSON 列写入时使用 orjson 序列化（与标准库一样将非字符串键转为字符串）"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _uses_queue_pool(database_uri):
+    """内存 SQLite 数据库由 Flask-SQLAlchemy 使用 StaticPool，不接受队列连接池的参数"""
+    url = make_url(database_uri)
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
 
 class Config:
     # 数据库配置
     load_dotenv()
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///finance.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
+    # AI建议后台保存线程数
+    ADVICE_SAVE_WORKERS = 4
+    # 连接池配置：每个 worker 进程各有一个连接池，容量为该进程的请求线程数加后台保存线程数，
+    # 数据库总连接数约为 GUNICORN_WORKERS × (pool_size + max_overflow)，需低于数据库的 max_connections；
+    # LIFO 复用最近使用的热连接
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_recycle': 1800,
+        'pool_pre_ping': False,
+        # JSON 列的读写使用 orjson 代替标准库 json
+        'json_serializer': _json_column_dumps,
+        'json_deserializer': orjson.loads
+    }
+    if _uses_queue_pool(SQLALCHEMY_DATABASE_URI):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE') or int(os.environ.get('GUNICORN_THREADS') or 16) + ADVICE_SAVE_WORKERS),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 0),
+            'pool_use_lifo': True
+        })
+
     # 应用配置
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     OPENAI_BASE_URL = os.environ.get('BASE_URL') or 'https://api.openai.com/v1'
@@ -15,8 +49,31 @@ class Config:
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     AI_MODEL = os.environ.get('AI_MODEL') or 'gpt-3.5-turbo'
     
+    # 响应压缩配置（流式响应不压缩，避免SSE等数据被缓冲）
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_STREAMS = False
+    
+    # 缓存配置：设置 CACHE_REDIS_URL 时使用 Redis，在各 worker 间共享缓存和失效版本；未设置时默认不缓存。
+    # SimpleCache 为进程内缓存，失效版本只在处理写请求的进程内递增，仅适用于单进程部署
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or ('RedisCache' if CACHE_REDIS_URL else 'NullCache')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT') or 300)
+    
+    # 静态文件由 nginx 发送时的内部路径前缀（例如 /_static/），为空时由 Flask 直接发送
+    STATIC_ACCEL_REDIRECT_PREFIX = os.environ.get('STATIC_ACCEL_REDIRECT_PREFIX')
+    
+    # Qwen API配置（投资推荐解释文本，与 OpenAI 兼容接口共用同一组环境变量）
+    QWEN_API_KEY = OPENAI_API_KEY
+    QWEN_API_URL = OPENAI_BASE_URL + '/chat/completions'
+    QWEN_MODEL = AI_MODEL
+    
+    # 日志配置
+    LOG_FILE = os.environ.get('LOG_FILE') or './logs/app.log'  # 日志文件路径
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'  # 日志级别
+    
     # 应用设置
-    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ['true', '1']
+    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in _TRUTHY
     
     # 问卷配置
     QUESTIONNAIRES = {
@@ -340,42 +397,26 @@ class Config:
         'stock': {'name': '股票', 'icon': '📈'}
     }
 
-
-"""
-智能金融助手 - 配置文件
-包含Qwen API相关配置信息
-"""
-
-# Qwen API配置
-QWEN_API_KEY = os.environ.get('OPENAI_API_KEY')  # Qwen API Key
-QWEN_API_URL = os.environ.get('BASE_URL')+"/chat/completions" or "https://api.openai.com/v1/chat/completions"  # Qwen API endpoint
-QWEN_MODEL = os.environ.get('AI_MODEL') or "gpt-3.5-turbo" # 使用的模型
-
-# 日志配置
-
-LOG_FILE = os.environ.get('LOG_FILE') or './logs/app.log'  # 日志文件路径
-LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'  # 日志级别
-
-# MPT算法配置
-MIN_PORTFOLIO_WEIGHT = 0.0  # 最小投资组合权重
-MAX_PORTFOLIO_WEIGHT = 1.0  # 最大投资组合权重
-WEIGHT_SUM_TOLERANCE = 1e-6  # 权重和的容差
-
-# 风险评分映射配置
-RISK_SCENARIO_MAPPING = {
-    "a) 卖出止损": 2,      # 保守型
-    "b) 继续持有": 5,      # 稳健型
-    "c) 加仓买入": 8       # 激进型
-}
-
-RISK_FOCUS_MAPPING = {
-    "a) 本金绝对安全": 1,       # 极度保守
-    "b) 跑赢通胀": 4,           # 稳健保守
-    "c) 获得远超市场的收益，哪怕风险很高": 9  # 激进
-}
-
-KNOWLEDGE_LEVEL_MAPPING = {
-    "a) 小白": 2,          # 投资新手，风险承受能力较低
-    "b) 略有了解": 5,      # 有一定投资经验
-    "c) 经验丰富": 8       # 投资专家，风险承受能力较高
-}
\ No newline at end of file
+    # MPT算法配置
+    MIN_PORTFOLIO_WEIGHT = 0.0  # 最小投资组合权重
+    MAX_PORTFOLIO_WEIGHT = 1.0  # 最大投资组合权重
+    WEIGHT_SUM_TOLERANCE = 1e-6  # 权重和的容差
+    
+    # 风险评分映射配置
+    RISK_SCENARIO_MAPPING = {
+        "a) 卖出止损": 2,      # 保守型
+        "b) 继续持有": 5,      # 稳健型
+        "c) 加仓买入": 8       # 激进型
+    }
+    
+    RISK_FOCUS_MAPPING = {
+        "a) 本金绝对安全": 1,       # 极度保守
+        "b) 跑赢通胀": 4,           # 稳健保守
+        "c) 获得远超市场的收益，哪怕风险很高": 9  # 激进
+    }
+    
+    KNOWLEDGE_LEVEL_MAPPING = {
+        "a) 小白": 2,          # 投资新手，风险承受能力较低
+        "b) 略有了解": 5,      # 有一定投资经验
+        "c) 经验丰富": 8       # 投资专家，风险承受能力较高
+    }
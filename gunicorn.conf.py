@@ -0,0 +1,30 @@
+"""
+Gunicorn 生产环境配置
+使用方式: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import multiprocessing
+import os
+
+from config import Config
+
+# 监听地址
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+
+# 接口以数据库查询和AI流式响应为主（I/O密集），
+# 使用 gthread 工作模式，由线程承载长连接的SSE请求，避免每个连接独占一个进程
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS') or min(multiprocessing.cpu_count() * 2 + 1, 8))
+threads = int(os.environ.get('GUNICORN_THREADS') or 16)
+
+# 进程内缓存的失效版本无法在 worker 间共享，多 worker 时会返回过期数据
+if workers > 1 and Config.CACHE_TYPE == 'SimpleCache':
+    raise RuntimeError('多 worker 部署不能使用 SimpleCache，请设置 CACHE_REDIS_URL 使用 Redis 缓存')
+
+# AI建议流式传输可能持续较长时间
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 120)
+keepalive = 5
+
+# 日志输出到控制台
+accesslog = '-'
+errorlog = '-'
@@ -6,8 +6,9 @@
 
 import os
 import sys
-from app import app, db
-from models import Bill, SavingsGoal, FinancialProfile, RiskProfile, Questionnaire, FinancialProduct, UserPreference, AIAdvice
+from flask import Flask
+from sqlalchemy import insert, text
+from models import db, Bill, SavingsGoal, FinancialProfile, RiskProfile, Questionnaire, FinancialProduct, UserPreference, AIAdvice
 from config import Config
 from datetime import datetime, date, timedelta
 import random
@@ -62,9 +63,7 @@ def create_sample_data():
         }
     ]
     
-    for bill_data in sample_bills:
-        bill = Bill(**bill_data)
-        db.session.add(bill)
+    db.session.execute(insert(Bill), sample_bills)
     
     # 创建示例储蓄目标
     sample_goals = [
@@ -91,9 +90,7 @@ def create_sample_data():
         }
     ]
     
-    for goal_data in sample_goals:
-        goal = SavingsGoal(**goal_data)
-        db.session.add(goal)
+    db.session.execute(insert(SavingsGoal), sample_goals)
     
     # 创建示例AI建议
     sample_advice = [
@@ -111,17 +108,22 @@ def create_sample_data():
         }
     ]
     
-    for advice_data in sample_advice:
-        advice = AIAdvice(**advice_data)
-        db.session.add(advice)
+    db.session.execute(insert(AIAdvice), sample_advice)
     
-    db.session.commit()
     print("示例数据创建完成")
 
+def create_app():
+    """创建只包含数据库配置的应用，初始化数据时无需加载路由、AI服务和MPT求解器"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
 def main():
     """主函数"""
     print("开始初始化数据库...")
     
+    app = create_app()
     with app.app_context():
         try:
             # 创建数据库表
@@ -129,28 +131,31 @@ def main():
             db.create_all()
             print("数据库表创建完成")
             
-            # 检查是否已有数据
-            if FinancialProduct.query.first():
+            # 检查是否已有数据（EXISTS 查询，不加载ORM对象）
+            if db.session.query(FinancialProduct.query.exists()).scalar():
                 print("数据库中已有数据，跳过初始化")
                 return
             
             # 初始化默认数据
             print("正在初始化默认数据...")
             
-            # 创建默认问卷
-            for key, questionnaire_data in Config.QUESTIONNAIRES.items():
-                questionnaire = Questionnaire(
-                    name=questionnaire_data['name'],
-                    description=questionnaire_data['description'],
-                    questions=questionnaire_data['questions'],
-                    type=key
-                )
-                db.session.add(questionnaire)
+            # SQLite 下种子数据写入期间不等待 fsync（仅限本初始化脚本的连接）
+            if db.engine.dialect.name == 'sqlite':
+                db.session.execute(text('PRAGMA synchronous=OFF'))
+            
+            # 创建默认问卷（批量插入）
+            db.session.execute(insert(Questionnaire), [
+                {
+                    'name': questionnaire_data['name'],
+                    'description': questionnaire_data['description'],
+                    'questions': questionnaire_data['questions'],
+                    'type': key
+                }
+                for key, questionnaire_data in Config.QUESTIONNAIRES.items()
+            ])
             
-            # 创建默认理财产品
-            for product_data in Config.DEFAULT_PRODUCTS:
-                product = FinancialProduct(**product_data)
-                db.session.add(product)
+            # 创建默认理财产品（批量插入）
+            db.session.execute(insert(FinancialProduct), Config.DEFAULT_PRODUCTS)
             
             # 创建默认用户偏好
             preference = UserPreference(
@@ -159,13 +164,13 @@ def main():
                 preferenceValue={'enabled': True, 'types': ['bill_reminder', 'goal_achievement']}
             )
             db.session.add(preference)
-            
-            db.session.commit()
             print("默认数据初始化完成")
             
             # 创建示例数据
             create_sample_data()
             
+            # 默认数据与示例数据在同一事务中提交
+            db.session.commit()
             print("数据库初始化完成！")
             
         except Exception as e:
@@ -1,12 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from datetime import datetime
 import json
+import sqlite3
 
 db = SQLAlchemy()
 
+# PostgreSQL 下使用 JSONB 以二进制形式存储 JSON，读取时无需重新解析文本；其他数据库沿用通用 JSON 类型
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
 class Bill(db.Model):
     __tablename__ = 'bills'
+    __table_args__ = (
+        db.Index('ix_bills_date_id', 'date', 'id'),  # 账单列表按日期游标分页
+        db.Index('ix_bills_type_date', 'type', 'date'),  # 按类型 + 日期范围过滤（账单列表与各统计查询）
+        db.Index('ix_bills_category', 'category'),  # 按分类过滤与分组
+        # PostgreSQL 下使用 pg_trgm GIN 索引支持 ILIKE '%关键词%' 搜索
+        db.Index('ix_bills_note_trgm', 'note',
+                 postgresql_using='gin', postgresql_ops={'note': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_bills_category_trgm', 'category',
+                 postgresql_using='gin', postgresql_ops={'category': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(50), nullable=False)  # 'income' or 'expense'
@@ -26,6 +44,26 @@ class Bill(db.Model):
             'note': self.note,
             'timestamp': self.timestamp.isoformat()
         }
+    
+    @classmethod
+    def dicts_for_query(cls, query):
+        """只查询所需列并直接构建字典列表，跳过ORM对象的构建；日期字段保留原始对象，由 orjson 序列化为与 to_dict() 相同的 ISO 格式"""
+        rows = query.with_entities(
+            cls.id, cls.type, cls.amount, cls.category, cls.date, cls.note, cls.timestamp
+        ).all()
+        return [
+            {
+                'id': id_,
+                'type': type_,
+                'amount': amount,
+                'category': category,
+                'date': date_,
+                'note': note,
+                'timestamp': timestamp
+            }
+            for id_, type_, amount, category, date_, note, timestamp in rows
+        ]
+
 
 class SavingsGoal(db.Model):
     __tablename__ = 'savings_goals'
@@ -47,8 +85,39 @@ class SavingsGoal(db.Model):
             'targetDate': self.targetDate.isoformat() if self.targetDate else None,
             'type': self.type,
             'createdAt': self.createdAt.isoformat(),
-            'progress': (self.currentAmount / self.targetAmount * 100) if self.targetAmount > 0 else 0
+            'progress': self.progress
         }
+    
+    @hybrid_property
+    def progress(self):
+        """储蓄进度（百分比）"""
+        return (self.currentAmount / self.targetAmount * 100) if self.targetAmount > 0 else 0
+    
+    @progress.expression
+    def progress(cls):
+        """储蓄进度的SQL表达式，可直接用于排序和过滤"""
+        return db.case((cls.targetAmount > 0, cls.currentAmount / cls.targetAmount * 100), else_=0)
+    
+    @classmethod
+    def dicts_for_query(cls, query):
+        """只查询所需列并直接构建字典列表，跳过ORM对象的构建；日期字段保留原始对象，由 orjson 序列化为与 to_dict() 相同的 ISO 格式"""
+        rows = query.with_entities(
+            cls.id, cls.name, cls.targetAmount, cls.currentAmount, cls.targetDate, cls.type, cls.createdAt,
+            cls.progress.label('progress')
+        ).all()
+        return [
+            {
+                'id': id_,
+                'name': name,
+                'targetAmount': target_amount,
+                'currentAmount': current_amount,
+                'targetDate': target_date,
+                'type': type_,
+                'createdAt': created_at,
+                'progress': progress
+            }
+            for id_, name, target_amount, current_amount, target_date, type_, created_at, progress in rows
+        ]
 
 class FinancialProfile(db.Model):
     __tablename__ = 'financial_profiles'
@@ -82,9 +151,9 @@ class RiskProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     userId = db.Column(db.String(100), unique=True, nullable=False, default='default_user')
     score = db.Column(db.Integer, default=0)
-    answers = db.Column(db.JSON, default={})
+    answers = db.Column(JSONType, default={})
     riskLevel = db.Column(db.String(20), default='保守型')
-    timestamp = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    timestamp = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def to_dict(self):
         return {
@@ -102,7 +171,7 @@ class Questionnaire(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
-    questions = db.Column(db.JSON, nullable=False)
+    questions = db.Column(JSONType, nullable=False)
     type = db.Column(db.String(50), default='risk_assessment')  # risk_assessment, financial_profile
     isActive = db.Column(db.Boolean, default=True)
     createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now())
@@ -122,6 +191,11 @@ class Questionnaire(db.Model):
 
 class FinancialProduct(db.Model):
     __tablename__ = 'financial_products'
+    __table_args__ = (
+        # PostgreSQL 下使用 pg_trgm GIN 索引支持产品名称 ILIKE '%关键词%' 搜索
+        db.Index('ix_financial_products_name_trgm', 'name',
+                 postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -131,8 +205,8 @@ class FinancialProduct(db.Model):
     expectedReturn = db.Column(db.Float, default=0)  # 预期年化收益率
     minInvestment = db.Column(db.Float, default=0)  # 最低投资额
     investmentPeriod = db.Column(db.String(50))  # 投资期限
-    features = db.Column(db.JSON, default={})
-    tags = db.Column(db.JSON, default=[])
+    features = db.Column(JSONType, default={})
+    tags = db.Column(JSONType, default=[])
     isActive = db.Column(db.Boolean, default=True)
     createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updatedAt = db.Column(db.DateTime(timezone=True), onupdate=func.now())
@@ -153,6 +227,34 @@ class FinancialProduct(db.Model):
             'createdAt': self.createdAt.isoformat(),
             'updatedAt': self.updatedAt.isoformat() if self.updatedAt else None
         }
+    
+    @classmethod
+    def dicts_for_query(cls, query):
+        """只查询所需列并直接构建字典列表，跳过ORM对象的构建；时间字段保留原始对象，由 orjson 序列化为与 to_dict() 相同的 ISO 格式"""
+        rows = query.with_entities(
+            cls.id, cls.name, cls.description, cls.productType, cls.riskLevel,
+            cls.expectedReturn, cls.minInvestment, cls.investmentPeriod,
+            cls.features, cls.tags, cls.isActive, cls.createdAt, cls.updatedAt
+        ).all()
+        return [
+            {
+                'id': id_,
+                'name': name,
+                'description': description,
+                'productType': product_type,
+                'riskLevel': risk_level,
+                'expectedReturn': expected_return,
+                'minInvestment': min_investment,
+                'investmentPeriod': investment_period,
+                'features': features,
+                'tags': tags,
+                'isActive': is_active,
+                'createdAt': created_at,
+                'updatedAt': updated_at
+            }
+            for (id_, name, description, product_type, risk_level, expected_return, min_investment,
+                 investment_period, features, tags, is_active, created_at, updated_at) in rows
+        ]
 
 class UserPreference(db.Model):
     __tablename__ = 'user_preferences'
@@ -160,7 +262,7 @@ class UserPreference(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     userId = db.Column(db.String(100), nullable=False, default='default_user')
     preferenceType = db.Column(db.String(50), nullable=False)  # notification, theme, language
-    preferenceValue = db.Column(db.JSON, nullable=False)
+    preferenceValue = db.Column(JSONType, nullable=False)
     createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updatedAt = db.Column(db.DateTime(timezone=True), onupdate=func.now())
     
@@ -176,12 +278,15 @@ class UserPreference(db.Model):
 
 class AIAdvice(db.Model):
     __tablename__ = 'ai_advice'
+    __table_args__ = (
+        db.Index('ix_advice_user_created', 'userId', 'createdAt'),  # 按用户查询建议历史
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     userId = db.Column(db.String(100), nullable=False, default='default_user')
     adviceType = db.Column(db.String(50), nullable=False)  # financial_planning, investment, savings
     content = db.Column(db.Text, nullable=False)
-    context = db.Column(db.JSON, default={})  # 生成建议的上下文信息
+    context = db.Column(JSONType, default={})  # 生成建议的上下文信息
     isRead = db.Column(db.Boolean, default=False)
     createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now())
     
@@ -194,4 +299,29 @@ class AIAdvice(db.Model):
             'context': self.context,
             'isRead': self.isRead,
             'createdAt': self.createdAt.isoformat()
-        }
\ No newline at end of file
+        }
+
+# 创建带 trigram 索引的表前启用 pg_trgm 扩展（仅 PostgreSQL）
+for _table in (Bill.__table__, FinancialProduct.__table__):
+    event.listen(
+        _table, 'before_create',
+        DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+    )
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    SQLite 连接建立时设置一次 PRAGMA：WAL 模式下读写互不阻塞，synchronous=NORMAL 仅在检查点时 fsync，
+    临时表放在内存中，并在写锁被占用时等待而不是立即报 database is locked；
+    读取通过内存映射（最多256MB，映射页由各连接共享）进行，减少 read() 系统调用。
+    连接由连接池复用，页缓存随连接保留。
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.close()
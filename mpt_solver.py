@@ -5,6 +5,7 @@
 
 import numpy as np
 import logging
+import threading
 from typing import Dict, List, Tuple, Any
 from scipy.optimize import minimize
 from utils import logger, format_percentage
@@ -55,6 +56,10 @@ class MPTSolver:
         self.covariance_matrix = COVARIANCE_MATRIX
         self.num_funds = len(FUNDS_NAMES)
 
+        # 有效边界只依赖固定的收益率和协方差矩阵，按组合数量缓存计算结果
+        self._frontier_cache: Dict[int, List[Dict[str, Any]]] = {}
+        self._frontier_lock = threading.Lock()
+
         logger.info(f"MPT求解器初始化完成，包含{self.num_funds}个基金")
         logger.info(f"预期收益率范围: {format_percentage(np.min(self.expected_returns))} - {format_percentage(np.max(self.expected_returns))}")
 
@@ -71,8 +76,8 @@ class MPTSolver:
         # 计算预期收益率
         expected_return = np.dot(weights, self.expected_returns)
 
-        # 计算波动率（标准差）
-        portfolio_variance = np.dot(weights.T, np.dot(self.covariance_matrix, weights))
+        # 计算波动率（标准差），二次型 wᵀΣw 用 einsum 一次求出，不生成 Σw 中间数组
+        portfolio_variance = np.einsum('i,ij,j->', weights, self.covariance_matrix, weights)
         volatility = np.sqrt(portfolio_variance)
 
         # 估算最大回撤（使用经验公式：最大回撤 ≈ 2-3倍波动率）
@@ -93,7 +98,9 @@ class MPTSolver:
             Dict: 包含优化结果的字典
         """
         # 约束条件：权重和为1
-        constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+        # 目标函数和约束均提供解析梯度，避免 SLSQP 通过有限差分对每个维度额外求值
+        ones = np.ones(self.num_funds)
+        constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: ones}
 
         # 边界条件：每个权重在0到1之间
         bounds = tuple([(0, 1) for _ in range(self.num_funds)])
@@ -106,31 +113,50 @@ class MPTSolver:
             def objective(weights):
                 return -np.dot(weights, self.expected_returns)  # 最大化收益率
 
-            # 添加风险约束
+            def objective_jac(weights):
+                return -self.expected_returns
+
+            # 添加风险约束（波动率 σ = sqrt(wᵀΣw)，梯度为 Σw / σ）
+            # 约束只需要波动率，直接计算而不调用 calculate_portfolio_metrics
+            def risk_fun(x):
+                return np.sqrt(np.einsum('i,ij,j->', x, self.covariance_matrix, x)) - target_risk
+
+            def risk_jac(x):
+                cov_x = self.covariance_matrix @ x
+                return cov_x / np.sqrt(x @ cov_x)
+
             risk_constraint = {
                 'type': 'eq',
-                'fun': lambda x: self.calculate_portfolio_metrics(x)[1] - target_risk
+                'fun': risk_fun,
+                'jac': risk_jac
             }
             constraints_list = [constraints, risk_constraint]
 
         elif target_return is not None:
             # 给定收益率，最小化风险
             def objective(weights):
-                portfolio_variance = np.dot(weights.T, np.dot(self.covariance_matrix, weights))
+                portfolio_variance = np.einsum('i,ij,j->', weights, self.covariance_matrix, weights)
                 return portfolio_variance  # 最小化方差
 
+            def objective_jac(weights):
+                return 2 * (self.covariance_matrix @ weights)
+
             # 添加收益约束
             return_constraint = {
                 'type': 'eq',
-                'fun': lambda x: np.dot(x, self.expected_returns) - target_return
+                'fun': lambda x: np.dot(x, self.expected_returns) - target_return,
+                'jac': lambda x: self.expected_returns
             }
             constraints_list = [constraints, return_constraint]
         else:
             # 默认：最小化风险
             def objective(weights):
-                portfolio_variance = np.dot(weights.T, np.dot(self.covariance_matrix, weights))
+                portfolio_variance = np.einsum('i,ij,j->', weights, self.covariance_matrix, weights)
                 return portfolio_variance
 
+            def objective_jac(weights):
+                return 2 * (self.covariance_matrix @ weights)
+
             constraints_list = [constraints]
 
         # 执行优化
@@ -138,6 +164,7 @@ class MPTSolver:
             objective,
             initial_weights,
             method='SLSQP',
+            jac=objective_jac,
             bounds=bounds,
             constraints=constraints_list,
             options={'ftol': 1e-9, 'disp': False}
@@ -209,6 +236,45 @@ class MPTSolver:
         logger.info(f"有效边界计算完成，成功生成{len(efficient_portfolios)}个有效投资组合")
         return efficient_portfolios
 
+    def get_efficient_frontier(self, num_portfolios: int = 100) -> List[Dict[str, Any]]:
+        """
+        获取有效边界（带缓存），首次调用时计算，之后直接返回缓存结果
+
+        Args:
+            num_portfolios: 生成投资组合的数量
+
+        Returns:
+            List[Dict]: 有效边界上的投资组合列表（调用方不应修改）
+        """
+        frontier = self._frontier_cache.get(num_portfolios)
+        if frontier is None:
+            # 并发的首次请求等待同一次计算完成，避免重复求解
+            with self._frontier_lock:
+                frontier = self._frontier_cache.get(num_portfolios)
+                if frontier is None:
+                    frontier = self.calculate_efficient_frontier(num_portfolios)
+                    self._frontier_cache[num_portfolios] = frontier
+        return frontier
+
+    def prewarm_efficient_frontier(self, num_portfolios: int = 100) -> threading.Thread:
+        """
+        在后台线程中预先计算有效边界，使首个投资推荐请求无需等待求解
+
+        Args:
+            num_portfolios: 生成投资组合的数量
+
+        Returns:
+            threading.Thread: 执行预计算的后台线程
+        """
+        thread = threading.Thread(
+            target=self.get_efficient_frontier,
+            args=(num_portfolios,),
+            name='mpt-frontier-prewarm',
+            daemon=True
+        )
+        thread.start()
+        return thread
+
     def map_risk_to_portfolio(self, risk_score: float, efficient_frontier: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         将用户风险评分映射到有效边界上的最优投资组合
@@ -248,9 +314,9 @@ class MPTSolver:
         portfolio_index = int(normalized_risk * (len(efficient_frontier) - 1))
         selected_portfolio = efficient_frontier[portfolio_index]
 
-        # 格式化权重，确保小的权重被设为0
+        # 格式化权重，确保小的权重被设为0（生成新数组，不修改有效边界中的数据）
         weights = selected_portfolio['weights']
-        weights[weights < 0.001] = 0  # 将小于0.1%的权重设为0
+        weights = np.where(weights < 0.001, 0, weights)  # 将小于0.1%的权重设为0
         weights = weights / np.sum(weights)  # 重新归一化
 
         logger.info(f"为风险评分{risk_score}分选择了第{portfolio_index+1}个投资组合")
@@ -276,22 +342,28 @@ class MPTSolver:
         Returns:
             Dict: 格式化后的投资组合结果
         """
-        weights = portfolio_data['weights']
-
-        # 创建投资组合列表
-        portfolio_list = []
-        for i, (fund_name, weight) in enumerate(zip(self.funds_names, weights)):
-            if weight > 0.001:  # 只包含权重大于0.1%的基金
-                amount = weight * investment_amount
-                portfolio_list.append({
-                    'fund_name': fund_name,
-                    'weight': weight,
-                    'weight_percentage': weight * 100,
-                    'investment_amount': amount
-                })
-
-        # 按权重排序
-        portfolio_list.sort(key=lambda x: x['weight'], reverse=True)
+        weights = np.asarray(portfolio_data['weights'])
+
+        # 只包含权重大于0.1%的基金，按权重从高到低排序（稳定排序，权重相同时保持基金原顺序）
+        selected = np.flatnonzero(weights > 0.001)
+        order = selected[np.argsort(-weights[selected], kind='stable')]
+
+        # 权重、百分比、投资金额按列整体计算，再一次性组装投资组合列表
+        plan_weights = weights[order]
+        portfolio_list = [
+            {
+                'fund_name': self.funds_names[i],
+                'weight': weight,
+                'weight_percentage': percentage,
+                'investment_amount': amount
+            }
+            for i, weight, percentage, amount in zip(
+                order.tolist(),
+                plan_weights.tolist(),
+                (plan_weights * 100).tolist(),
+                (plan_weights * investment_amount).tolist()
+            )
+        ]
 
         return {
             'plan_list': portfolio_list,
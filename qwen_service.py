@@ -4,20 +4,58 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
 import logging
 import re
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from config import QWEN_API_KEY, QWEN_API_URL, QWEN_MODEL
+from config import Config
 from utils import logger, format_percentage, format_currency
 
+# 系统提示词及附加在用户提示词末尾的格式要求（固定内容，模块加载时构建一次）
+QWEN_SYSTEM_PROMPT = """你是一位专业的金融投资顾问，擅长基于现代投资组合理论为用户提供投资建议。请用专业、易懂的语言解释投资组合配置的原理。
+
+重要格式要求：
+1. 严格禁止使用任何Markdown格式标记，包括但不限于：
+   - 标题标记：#, ##, ### 等
+   - 粗体标记：**, __
+   - 斜体标记：*, _
+   - 行内代码标记：`
+   - 列表标记：-, *, + 等
+2. 所有标题和段落仅使用纯文本和换行符分隔
+3. 如果需要分段，请直接使用换行符
+4. 使用简洁、清晰的纯文本格式输出"""
+
+QWEN_FORMAT_REMINDER = "\n\n请严格遵循上述格式要求，输出纯文本内容，禁止使用任何Markdown标记。"
+
+# clean_qwen_output 使用的正则，模块加载时编译一次
+_MD_HEADING_RE = re.compile(r'^\s*#+\s*', re.MULTILINE)
+_MD_BOLD_STAR_RE = re.compile(r'\*\*(.*?)\*\*')
+_MD_BOLD_UNDERSCORE_RE = re.compile(r'__(.*?)__')
+_MD_ITALIC_STAR_RE = re.compile(r'\*(.*?)\*')
+_MD_CODE_RE = re.compile(r'`(.*?)`')
+_MD_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n')
+
 class QwenService:
     """Qwen大模型服务类"""
 
     def __init__(self):
-        self.api_key = QWEN_API_KEY
-        self.api_url = QWEN_API_URL
-        self.model = QWEN_MODEL
+        self.api_key = Config.QWEN_API_KEY
+        self.api_url = Config.QWEN_API_URL
+        self.model = Config.QWEN_MODEL
+
+        # 复用连接池中的 keep-alive 连接，避免每次调用重新建立 TCP/TLS 连接
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # 请求头在服务生命周期内不变，设置在会话上，每次调用无需重新构建
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
 
         logger.info(f"Qwen服务初始化完成，使用模型: {self.model}")
 
@@ -35,22 +73,22 @@ class QwenService:
             return text
 
         # 移除 Markdown 标题标记 (##, ###, # 等)
-        text = re.sub(r'^\s*#+\s*', '', text, flags=re.MULTILINE)
+        text = _MD_HEADING_RE.sub('', text)
 
         # 移除 Markdown 粗体标记 (**粗体**)
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+        text = _MD_BOLD_STAR_RE.sub(r'\1', text)
 
         # 移除 Markdown 下划线粗体 (__粗体__)
-        text = re.sub(r'__(.*?)__', r'\1', text)
+        text = _MD_BOLD_UNDERSCORE_RE.sub(r'\1', text)
 
         # 移除 Markdown 斜体标记 (*斜体*)
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
+        text = _MD_ITALIC_STAR_RE.sub(r'\1', text)
 
         # 移除 Markdown 行内代码标记 (`代码`)
-        text = re.sub(r'`(.*?)`', r'\1', text)
+        text = _MD_CODE_RE.sub(r'\1', text)
 
         # 移除多余的空行
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+        text = _MD_BLANK_LINES_RE.sub('\n\n', text)
 
         # 清理首尾空白字符
         text = text.strip()
@@ -68,32 +106,16 @@ class QwenService:
         Returns:
             Optional[str]: API响应文本，失败时返回None
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
             "messages": [
                 {
                     "role": "system",
-                    "content": """你是一位专业的金融投资顾问，擅长基于现代投资组合理论为用户提供投资建议。请用专业、易懂的语言解释投资组合配置的原理。
-
-重要格式要求：
-1. 严格禁止使用任何Markdown格式标记，包括但不限于：
-   - 标题标记：#, ##, ### 等
-   - 粗体标记：**, __
-   - 斜体标记：*, _
-   - 行内代码标记：`
-   - 列表标记：-, *, + 等
-2. 所有标题和段落仅使用纯文本和换行符分隔
-3. 如果需要分段，请直接使用换行符
-4. 使用简洁、清晰的纯文本格式输出"""
+                    "content": QWEN_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
-                    "content": prompt + "\n\n请严格遵循上述格式要求，输出纯文本内容，禁止使用任何Markdown标记。"
+                    "content": prompt + QWEN_FORMAT_REMINDER
                 }
             ],
             "max_tokens": max_tokens,
@@ -105,15 +127,15 @@ class QwenService:
             logger.info(f"正在调用Qwen API，模型: {self.model}")
             logger.info(f"请求输入长度: {len(prompt)} 字符")
 
-            response = requests.post(
+            # 请求体与响应均用 orjson 编解码（Content-Type 已设置在会话请求头上）
+            response = self._session.post(
                 self.api_url,
-                headers=headers,
-                json=payload,
+                data=orjson.dumps(payload),
                 timeout=60
             )
 
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 generated_text = result.get("choices", [{}])[0].get("message", {}).get("content", "")
 
                 logger.info(f"Qwen API调用成功，生成文本长度: {len(generated_text)} 字符")
@@ -278,5 +300,13 @@ class QwenService:
 
         return explanation
 
-# 创建全局Qwen服务实例
-qwen_service = QwenService()
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_qwen_service() -> QwenService:
+    """
+    获取全局Qwen服务实例，首次调用时才创建，仅导入模块时不初始化
+
+    Returns:
+        QwenService: Qwen服务实例
+    """
+    return QwenService()
@@ -1,52 +1,123 @@
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, extract, and_
+from sqlalchemy import func, extract, and_, case
 from models import db, Bill, SavingsGoal, FinancialProfile, RiskProfile, FinancialProduct, AIAdvice
 from config import Config
 from openai import OpenAI
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from bisect import bisect_left
+from flask import current_app
+
+# 建议提示词模板（模块加载时构建一次，流式与非流式接口共用，调用时用 format_map 填充）
+FINANCIAL_PROMPT_TMPL = """
+            基于以下用户信息，请提供个性化的财务建议：
+            
+            当前财务状况：
+            - 本月收入：¥{totalIncome:.2f}
+            - 本月支出：¥{totalExpense:.2f}
+            - 本月结余：¥{balance:.2f}
+            - 财务健康分数：{healthScore}分
+            
+            用户画像：
+            - 财务类型：{profile_type}
+            - 风险等级：{risk_level}
+            
+            请提供：
+            1. 财务管理建议
+            2. 储蓄建议
+            3. 投资建议
+            4. 需要改进的地方
+            
+            请以清晰、实用的方式回答，适合普通用户理解。
+            """
+
+INVESTMENT_PROMPT_TMPL = """
+            为用户生成投资建议：
+            
+            用户风险等级：{risk_level}
+            投资风格：{investment_style}
+            推荐产品类型：{recommended_products}
+            
+            当前财务状况：
+            - 月收入：¥{totalIncome:.2f}
+            - 月结余：¥{balance:.2f}
+            
+            请提供：
+            1. 资产配置建议
+            2. 具体产品推荐
+            3. 投资时机建议
+            4. 风险控制措施
+            5. 投资金额建议
+            
+            投资建议应该具体、实用，适合{investment_style}的投资者。
+            """
+
+# 财务健康分数的分档表（与 bisect_left 配合，区间左开右闭）
+SAVINGS_RATE_BOUNDS = (5, 10, 20)
+SAVINGS_RATE_BONUS = (0, 10, 20, 30)
+EXPENSE_RATIO_BOUNDS = (0.8, 0.9)
+EXPENSE_RATIO_PENALTY = (0, -10, -20)
+
+# 支出分类的显示名称映射（未配置的分类沿用原值），模块加载时构建一次
+EXPENSE_CATEGORY_NAME = case(Config.CATEGORIES['expense'], value=Bill.category, else_=Bill.category)
+
+@lru_cache(maxsize=1)
+def _month_range(today_ordinal):
+    """按日期序数计算所在月份的起始和结束日期，同一天内直接命中缓存"""
+    today = date.fromordinal(today_ordinal)
+    start_date = today.replace(day=1)
+    
+    next_month = today.replace(day=28) + timedelta(days=4)
+    end_date = next_month - timedelta(days=next_month.day)
+    return start_date, end_date
 
 class FinancialService:
     
     @staticmethod
     def get_current_month_range():
         """获取当前月份的起始和结束日期"""
-        today = date.today()
-        start_date = today.replace(day=1)
-        
-        next_month = today.replace(day=28) + timedelta(days=4)
-        end_date = next_month - timedelta(days=next_month.day)
-        return start_date, end_date
+        return _month_range(date.today().toordinal())
     
     @staticmethod
     def get_dashboard_summary(user_id='default_user'):
         """获取仪表盘摘要数据"""
         start_date, end_date = FinancialService.get_current_month_range()
         
-        # 计算总收入
-        total_income = db.session.query(func.sum(Bill.amount)).filter(
-            Bill.type == 'income',
+        # 一次查询同时计算总收入和总支出
+        total_income, total_expense = FinancialService.sum_income_expense(
             Bill.date >= start_date,
             Bill.date <= end_date
-        ).scalar() or 0
-        
-        # 计算总支出
-        total_expense = db.session.query(func.sum(Bill.amount)).filter(
-            Bill.type == 'expense',
-            Bill.date >= start_date,
-            Bill.date <= end_date
-        ).scalar() or 0
+        )
         balance = total_income - total_expense
         
         # 计算财务健康分数
         health_score = FinancialService.calculate_health_score(total_income, total_expense, balance)
         
+        # 账单总数由 COUNT 聚合得出，不依赖分页的账单列表
+        bill_count = db.session.query(func.count(Bill.id)).scalar()
+        
         return {
             'totalIncome': total_income,
             'totalExpense': total_expense,
             'balance': balance,
-            'healthScore': health_score
+            'healthScore': health_score,
+            'billCount': bill_count
         }
     
+    @staticmethod
+    def sum_income_expense(*criteria):
+        """按条件汇总账单，在同一次扫描中返回 (总收入, 总支出)"""
+        row = db.session.query(
+            func.sum(case((Bill.type == 'income', Bill.amount), else_=0)).label('income'),
+            func.sum(case((Bill.type == 'expense', Bill.amount), else_=0)).label('expense')
+        ).filter(
+            Bill.type.in_(('income', 'expense')),
+            *criteria
+        ).one()
+        return row.income or 0, row.expense or 0
+    
     @staticmethod
     def calculate_health_score(total_income, total_expense, balance):
         """计算财务健康分数"""
@@ -55,22 +126,13 @@ class FinancialService:
         
         score = 50
         
-        # 储蓄率评分
+        # 储蓄率评分：>5% / >10% / >20% 分别加 10 / 20 / 30 分
         savings_rate = (balance / total_income) * 100 if total_income > 0 else 0
-        if savings_rate > 20:
-            score += 30
-        elif savings_rate > 10:
-            score += 20
-        elif savings_rate > 5:
-            score += 10
+        score += SAVINGS_RATE_BONUS[bisect_left(SAVINGS_RATE_BOUNDS, savings_rate)]
         
-        # 支出比例评分
+        # 支出比例评分：>0.8 / >0.9 分别扣 10 / 20 分
         expense_ratio = total_expense / total_income if total_income > 0 else 0
-        if expense_ratio > 0.9:
-            score -= 20
-        elif expense_ratio > 0.8:
-            score -= 10
-        print(f"Calculated health score: {score}")
+        score += EXPENSE_RATIO_PENALTY[bisect_left(EXPENSE_RATIO_BOUNDS, expense_ratio)]
         return max(0, min(100, score))
     
     @staticmethod
@@ -84,38 +146,27 @@ class FinancialService:
             group_by = extract('month', Bill.date)
             dates = [f'{i}月' for i in range(1, 13)]
         else:  # 默认 'month'
-            start_date = today.replace(day=1)
-            # 获取当月最后一天作为结束日期
-            next_month = today.replace(day=28) + timedelta(days=4)
-            end_date = next_month - timedelta(days=next_month.day)
+            start_date, end_date = _month_range(today.toordinal())
             group_by = extract('day', Bill.date)
             # 生成整个月的日期，不只是到今天
             days_in_month = end_date.day
             dates = [f'{i}日' for i in range(1, days_in_month + 1)]
         
-        # 收入查询
-        income_q = db.session.query(
-            group_by.label('period'), func.sum(Bill.amount).label('total')
-        ).filter(
-            Bill.type == 'income',
-            Bill.date >= start_date,
-            Bill.date <= end_date
-        ).group_by('period').all()
-        
-        # 支出查询
-        expense_q = db.session.query(
-            group_by.label('period'), func.sum(Bill.amount).label('total')
+        # 收入和支出在一次查询中按 (类型, 周期) 分组汇总
+        rows = db.session.query(
+            Bill.type.label('type'), group_by.label('period'), func.sum(Bill.amount).label('total')
         ).filter(
-            Bill.type == 'expense',
+            Bill.type.in_(('income', 'expense')),
             Bill.date >= start_date,
             Bill.date <= end_date
-        ).group_by('period').all()
+        ).group_by('type', 'period').all()
         
-        income_map = {int(item.period): float(item.total) for item in income_q}
-        expense_map = {int(item.period): float(item.total) for item in expense_q}
-        
-        income_data = [income_map.get(i+1, 0.0) for i in range(len(dates))]
-        expense_data = [expense_map.get(i+1, 0.0) for i in range(len(dates))]
+        # 预分配每个周期的序列，按周期序号（从1开始）直接写入对应位置
+        income_data = [0.0] * len(dates)
+        expense_data = [0.0] * len(dates)
+        series = {'income': income_data, 'expense': expense_data}
+        for item in rows:
+            series[item.type][int(item.period) - 1] = float(item.total)
         
         return {
             'dates': dates,
@@ -128,44 +179,32 @@ class FinancialService:
         """获取支出饼图数据"""
         start_date, end_date = FinancialService.get_current_month_range()
         
+        # 分类显示名称由数据库通过 CASE 映射，查询结果可直接返回
         expense_data = db.session.query(
-            Bill.category, func.sum(Bill.amount).label('total')
+            EXPENSE_CATEGORY_NAME.label('name'), func.sum(Bill.amount).label('value')
         ).filter(
             Bill.type == 'expense',
             Bill.date >= start_date,
             Bill.date <= end_date
         ).group_by(Bill.category).all()
         
-        category_names = Config.CATEGORIES['expense']
-        
-        data = [
-            {
-                'value': item.total, 
-                'name': category_names.get(item.category, item.category)
-            } for item in expense_data
-        ]
-        
-        return data
+        return [{'value': item.value, 'name': item.name} for item in expense_data]
     
     @staticmethod
     def get_savings_stats(user_id='default_user'):
         """获取储蓄统计"""
-        goals = SavingsGoal.query.all()
-        total_savings = sum(g.currentAmount for g in goals)
-        active_goals = sum(1 for g in goals if g.currentAmount < g.targetAmount)
-        completed_goals = sum(1 for g in goals if g.currentAmount >= g.targetAmount)
+        # 储蓄目标的总额与进行中/已完成数量由数据库一次聚合得出，无需加载每个目标
+        total_savings, active_goals, completed_goals = db.session.query(
+            func.coalesce(func.sum(SavingsGoal.currentAmount), 0),
+            func.count(case((SavingsGoal.currentAmount < SavingsGoal.targetAmount, 1))),
+            func.count(case((SavingsGoal.currentAmount >= SavingsGoal.targetAmount, 1)))
+        ).one()
         
         # 计算本月储蓄（基于最近30天的结余）
         thirty_days_ago = date.today() - timedelta(days=30)
-        monthly_income = db.session.query(func.sum(Bill.amount)).filter(
-            Bill.type == 'income',
+        monthly_income, monthly_expense = FinancialService.sum_income_expense(
             Bill.date >= thirty_days_ago
-        ).scalar() or 0
-        
-        monthly_expense = db.session.query(func.sum(Bill.amount)).filter(
-            Bill.type == 'expense',
-            Bill.date >= thirty_days_ago
-        ).scalar() or 0
+        )
         
         monthly_savings = monthly_income - monthly_expense
         
@@ -176,45 +215,60 @@ class FinancialService:
             'monthlySavings': monthly_savings
         }
 
+# 正在生成中的流式建议，按 (建议类型, 用户) 加锁，避免重复点击同时发起多次AI调用（仅限当前进程）
+_advice_locks = {}
+
+def single_flight_advice(kind):
+    """同一用户同一类型的流式建议同时只生成一份，重复请求直接提示稍候"""
+    def decorator(generate):
+        @wraps(generate)
+        def wrapper(self, user_id='default_user'):
+            lock = _advice_locks.setdefault((kind, user_id), threading.Lock())
+            if not lock.acquire(blocking=False):
+                yield "建议正在生成中，请稍候…"
+                return
+            try:
+                yield from generate(self, user_id)
+            finally:
+                lock.release()
+        return wrapper
+    return decorator
+
 class AIAdviceService:
     
-    def __init__(self):
-        """初始化 OpenAI 客户端"""
-        self.client = OpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            base_url=getattr(Config, 'OPENAI_BASE_URL', None)  # 可选的自定义 base_url
-        )
+    # 流式建议结束后在后台线程中保存，结束信号无需等待数据库写入
+    _save_executor = ThreadPoolExecutor(max_workers=Config.ADVICE_SAVE_WORKERS, thread_name_prefix='advice-save')
+    
+    # 进程内所有实例共享同一个 OpenAI 客户端，复用连接池中的 keep-alive 连接，避免每次请求重新握手
+    _client = None
+    _client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """首次调用时创建共享的 OpenAI 客户端（未配置API密钥时导入应用不会失败）"""
+        if AIAdviceService._client is None:
+            with AIAdviceService._client_lock:
+                if AIAdviceService._client is None:
+                    AIAdviceService._client = OpenAI(
+                        api_key=Config.OPENAI_API_KEY,
+                        base_url=getattr(Config, 'OPENAI_BASE_URL', None)  # 可选的自定义 base_url
+                    )
+        return AIAdviceService._client
         
+    @single_flight_advice('financial')
     def generate_financial_advice_stream(self, user_id='default_user'):
         """生成财务建议（流式传输）"""
         try:
             # 获取用户数据
             dashboard_data = FinancialService.get_dashboard_summary(user_id)
-            profile = FinancialProfile.query.filter_by(userId=user_id).first()
-            risk_profile = RiskProfile.query.filter_by(userId=user_id).first()
+            profile, risk_profile = self._get_user_profiles(user_id)
             
             # 构建提示
-            prompt = f"""
-            基于以下用户信息，请提供个性化的财务建议：
-            
-            当前财务状况：
-            - 本月收入：¥{dashboard_data['totalIncome']:.2f}
-            - 本月支出：¥{dashboard_data['totalExpense']:.2f}
-            - 本月结余：¥{dashboard_data['balance']:.2f}
-            - 财务健康分数：{dashboard_data['healthScore']}分
-            
-            用户画像：
-            - 财务类型：{profile.type if profile else '未评估'}
-            - 风险等级：{risk_profile.riskLevel if risk_profile else '未评估'}
-            
-            请提供：
-            1. 财务管理建议
-            2. 储蓄建议
-            3. 投资建议
-            4. 需要改进的地方
-            
-            请以清晰、实用的方式回答，适合普通用户理解。
-            """
+            prompt = FINANCIAL_PROMPT_TMPL.format_map({
+                **dashboard_data,
+                'profile_type': profile.type if profile else '未评估',
+                'risk_level': risk_profile.riskLevel if risk_profile else '未评估'
+            })
             
             if not Config.OPENAI_API_KEY:
                 yield "AI建议功能暂时不可用，请配置API密钥。"
@@ -244,11 +298,16 @@ class AIAdviceService:
             
             # 保存完整的建议到数据库
             complete_advice = ''.join(full_content)
-            self._save_financial_advice(user_id, complete_advice, dashboard_data, profile, risk_profile)
+            self._save_in_background(
+                self._save_financial_advice, user_id, complete_advice, dashboard_data,
+                profile.type if profile else None,
+                risk_profile.riskLevel if risk_profile else None
+            )
             
         except Exception as e:
             yield f"生成建议时出现错误：{str(e)}"
     
+    @single_flight_advice('investment')
     def generate_investment_advice_stream(self, user_id='default_user'):
         """生成投资建议（流式传输）"""
         try:
@@ -271,26 +330,12 @@ class AIAdviceService:
                 recommended_products = ['fund', 'stock', '混合投资']
                 investment_style = '积极进取'
             
-            prompt = f"""
-            为用户生成投资建议：
-            
-            用户风险等级：{risk_profile.riskLevel}
-            投资风格：{investment_style}
-            推荐产品类型：{', '.join(recommended_products)}
-            
-            当前财务状况：
-            - 月收入：¥{dashboard_data['totalIncome']:.2f}
-            - 月结余：¥{dashboard_data['balance']:.2f}
-            
-            请提供：
-            1. 资产配置建议
-            2. 具体产品推荐
-            3. 投资时机建议
-            4. 风险控制措施
-            5. 投资金额建议
-            
-            投资建议应该具体、实用，适合{investment_style}的投资者。
-            """
+            prompt = INVESTMENT_PROMPT_TMPL.format_map({
+                **dashboard_data,
+                'risk_level': risk_profile.riskLevel,
+                'investment_style': investment_style,
+                'recommended_products': ', '.join(recommended_products)
+            })
             
             if not Config.OPENAI_API_KEY:
                 yield "AI投资建议功能暂时不可用。"
@@ -320,12 +365,35 @@ class AIAdviceService:
             
             # 保存完整的建议到数据库
             complete_advice = ''.join(full_content)
-            self._save_investment_advice(user_id, complete_advice, risk_profile, dashboard_data, recommended_products)
+            self._save_in_background(self._save_investment_advice, user_id, complete_advice, risk_profile.riskLevel, dashboard_data, recommended_products)
             
         except Exception as e:
             yield f"生成投资建议时出现错误：{str(e)}"
     
-    def _save_financial_advice(self, user_id, advice, dashboard_data, profile, risk_profile):
+    @staticmethod
+    def _get_user_profiles(user_id):
+        """一次查询同时获取用户的财务画像和风险画像，不存在的一方为 None"""
+        user = db.select(db.literal(user_id).label('userId')).subquery()
+        return db.session.execute(
+            db.select(FinancialProfile, RiskProfile)
+            .select_from(user)
+            .outerjoin(FinancialProfile, FinancialProfile.userId == user.c.userId)
+            .outerjoin(RiskProfile, RiskProfile.userId == user.c.userId)
+            .limit(1)
+        ).one()
+    
+    def _save_in_background(self, save, *args):
+        """在后台线程的独立应用上下文（即独立数据库会话）中执行保存。
+        参数只能是普通值：请求会话中的模型实例在请求结束后会脱离会话，后台线程访问其属性可能触发失败的懒加载"""
+        app = current_app._get_current_object()
+        
+        def run():
+            with app.app_context():
+                save(*args)
+        
+        self._save_executor.submit(run)
+    
+    def _save_financial_advice(self, user_id, advice, dashboard_data, profile_type, risk_level):
         """保存财务建议到数据库"""
         try:
             ai_advice = AIAdvice(
@@ -334,8 +402,8 @@ class AIAdviceService:
                 content=advice,
                 context={
                     'dashboard_data': dashboard_data,
-                    'profile_type': profile.type if profile else None,
-                    'risk_level': risk_profile.riskLevel if risk_profile else None
+                    'profile_type': profile_type,
+                    'risk_level': risk_level
                 }
             )
             db.session.add(ai_advice)
@@ -343,7 +411,7 @@ class AIAdviceService:
         except Exception as e:
             print(f"保存财务建议失败: {str(e)}")
     
-    def _save_investment_advice(self, user_id, advice, risk_profile, dashboard_data, recommended_products):
+    def _save_investment_advice(self, user_id, advice, risk_level, dashboard_data, recommended_products):
         """保存投资建议到数据库"""
         try:
             ai_advice = AIAdvice(
@@ -351,7 +419,7 @@ class AIAdviceService:
                 adviceType='investment',
                 content=advice,
                 context={
-                    'risk_level': risk_profile.riskLevel,
+                    'risk_level': risk_level,
                     'recommended_products': recommended_products,
                     'dashboard_data': dashboard_data
                 }
@@ -366,35 +434,17 @@ class AIAdviceService:
         try:
             # 获取用户数据
             dashboard_data = FinancialService.get_dashboard_summary(user_id)
-            profile = FinancialProfile.query.filter_by(userId=user_id).first()
-            risk_profile = RiskProfile.query.filter_by(userId=user_id).first()
+            profile, risk_profile = self._get_user_profiles(user_id)
             
             # 构建提示
-            prompt = f"""
-            基于以下用户信息，请提供个性化的财务建议：
-            
-            当前财务状况：
-            - 本月收入：¥{dashboard_data['totalIncome']:.2f}
-            - 本月支出：¥{dashboard_data['totalExpense']:.2f}
-            - 本月结余：¥{dashboard_data['balance']:.2f}
-            - 财务健康分数：{dashboard_data['healthScore']}分
-            
-            用户画像：
-            - 财务类型：{profile.type if profile else '未评估'}
-            - 风险等级：{risk_profile.riskLevel if risk_profile else '未评估'}
-            
-            请提供：
-            1. 财务管理建议
-            2. 储蓄建议
-            3. 投资建议
-            4. 需要改进的地方
-            
-            请以清晰、实用的方式回答，适合普通用户理解。
-            """
+            prompt = FINANCIAL_PROMPT_TMPL.format_map({
+                **dashboard_data,
+                'profile_type': profile.type if profile else '未评估',
+                'risk_level': risk_profile.riskLevel if risk_profile else '未评估'
+            })
             
             if not Config.OPENAI_API_KEY:
                 return "AI建议功能暂时不可用，请配置API密钥。"
-            service = AIAdviceService()
             response = self.client.chat.completions.create(
                 model=Config.AI_MODEL,
                 messages=[
@@ -458,26 +508,12 @@ class AIAdviceService:
                 recommended_products = ['fund', 'stock', '混合投资']
                 investment_style = '积极进取'
             
-            prompt = f"""
-            为用户生成投资建议：
-            
-            用户风险等级：{risk_profile.riskLevel}
-            投资风格：{investment_style}
-            推荐产品类型：{', '.join(recommended_products)}
-            
-            当前财务状况：
-            - 月收入：¥{dashboard_data['totalIncome']:.2f}
-            - 月结余：¥{dashboard_data['balance']:.2f}
-            
-            请提供：
-            1. 资产配置建议
-            2. 具体产品推荐
-            3. 投资时机建议
-            4. 风险控制措施
-            5. 投资金额建议
-            
-            投资建议应该具体、实用，适合{investment_style}的投资者。
-            """
+            prompt = INVESTMENT_PROMPT_TMPL.format_map({
+                **dashboard_data,
+                'risk_level': risk_profile.riskLevel,
+                'investment_style': investment_style,
+                'recommended_products': ', '.join(recommended_products)
+            })
             
             if not Config.OPENAI_API_KEY:
                 return "AI投资建议功能暂时不可用。"
@@ -549,7 +585,7 @@ class ProductService:
                 products = FinancialProduct.query.filter_by(
                     riskLevel='low',
                     isActive=True
-                ).limit(limit).all()
+                ).limit(limit)
             else:
                 # 根据风险等级推荐产品
                 if risk_profile.riskLevel == '保守型':
@@ -562,9 +598,9 @@ class ProductService:
                 products = FinancialProduct.query.filter(
                     FinancialProduct.riskLevel.in_(risk_levels),
                     FinancialProduct.isActive == True
-                ).order_by(FinancialProduct.expectedReturn.desc()).limit(limit).all()
+                ).order_by(FinancialProduct.expectedReturn.desc()).limit(limit)
             
-            return [product.to_dict() for product in products]
+            return FinancialProduct.dicts_for_query(products)
             
         except Exception as e:
             return []
@@ -584,9 +620,9 @@ class ProductService:
             if risk_level:
                 q = q.filter(FinancialProduct.riskLevel == risk_level)
             
-            products = q.order_by(FinancialProduct.expectedReturn.desc()).limit(limit).all()
-            
-            return [product.to_dict() for product in products]
+            return FinancialProduct.dicts_for_query(
+                q.order_by(FinancialProduct.expectedReturn.desc()).limit(limit)
+            )
             
         except Exception as e:
             return []
\ No newline at end of file
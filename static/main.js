@@ -16,6 +16,7 @@ class FinanceManager {
     constructor() {
         // 本地缓存，用于减少不必要的API调用
         this.bills = [];
+        this.nextBillsCursor = null;
         this.savingsGoals = [];
         this.financialProfile = null;
         this.riskProfile = null;
@@ -56,9 +57,10 @@ class FinanceManager {
 
     // --- 通用 API Fetcher ---
     async request(endpoint, options = {}) {
+        const { withHeaders, ...fetchOptions } = options;
         try {
             const response = await fetch(`${API_BASE_URL}${endpoint}`, {
-                ...options,
+                ...fetchOptions,
                 headers: {
                     'Content-Type': 'application/json',
                     ...options.headers,
@@ -74,6 +76,10 @@ class FinanceManager {
                 return null;
             }
             
+            if (withHeaders) {
+                return { data: await response.json(), headers: response.headers };
+            }
+            
             return response.json();
         } catch (error) {
             console.error('Fetch error:', error);
@@ -84,11 +90,33 @@ class FinanceManager {
 
     // --- 账单 (Bills) ---
     async getBills(params = {}) {
-        const query = new URLSearchParams(params).toString();
-        this.bills = await this.request(`/bills?${query}`);
+        this.bills = await this.fetchBillsPage(params);
         return this.bills;
     }
 
+    // 按游标加载下一页账单，没有更多数据时返回空数组
+    async loadMoreBills(params = {}) {
+        if (!this.nextBillsCursor) {
+            return [];
+        }
+        const bills = await this.fetchBillsPage({ ...params, ...this.nextBillsCursor });
+        this.bills = this.bills.concat(bills);
+        return bills;
+    }
+
+    hasMoreBills() {
+        return this.nextBillsCursor !== null;
+    }
+
+    async fetchBillsPage(params) {
+        const query = new URLSearchParams(params).toString();
+        const { data, headers } = await this.request(`/bills?${query}`, { withHeaders: true });
+        const cursorDate = headers.get('X-Next-Cursor-Date');
+        const cursorId = headers.get('X-Next-Cursor-Id');
+        this.nextBillsCursor = cursorDate && cursorId ? { cursor_date: cursorDate, cursor_id: cursorId } : null;
+        return data;
+    }
+
     async addBill(bill) {
         const newBill = await this.request('/bills', {
             method: 'POST',
@@ -3,34 +3,55 @@
 包含日志配置、数据清洗等辅助功能
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import re
 from typing import Union, Any, Dict
-from config import LOG_FILE, LOG_LEVEL
+from config import Config
 
 def setup_logging():
     """
     配置日志系统
-    创建日志目录并设置日志格式
+    创建日志目录并设置日志格式；请求线程只把日志记录放入队列，
+    文件和控制台写入由后台监听线程完成
     """
     # 确保日志目录存在
-    log_dir = os.path.dirname(LOG_FILE)
+    log_dir = os.path.dirname(Config.LOG_FILE)
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
 
-    # 配置日志格式
+    # 配置日志格式（由后台线程中的实际输出处理器使用）
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(Config.LOG_FILE, encoding='utf-8')
+    stream_handler = logging.StreamHandler()  # 同时输出到控制台
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # 入队时只合并消息文本，完整格式由输出处理器添加，避免重复前缀
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
     logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE, encoding='utf-8'),
-            logging.StreamHandler()  # 同时输出到控制台
-        ]
+        level=getattr(logging, Config.LOG_LEVEL.upper()),
+        handlers=[queue_handler]
     )
 
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    # 进程退出时处理完队列中剩余的日志
+    atexit.register(listener.stop)
+
     return logging.getLogger(__name__)
 
+# clean_numeric_input 需要移除的字符，模块加载时编译一次
+_NON_NUMERIC_RE = re.compile(r'[岁年万千元years$,\s]', re.IGNORECASE)
+
 def clean_numeric_input(value: Union[str, int, float]) -> float:
     """
     清洗数字输入，移除常见的非数字字符
@@ -52,28 +73,15 @@ def clean_numeric_input(value: Union[str, int, float]) -> float:
     if not isinstance(value, str):
         raise ValueError(f"无法处理的输入类型: {type(value)}")
 
-    # 移除中文字符（岁、年、万元、千元、元等）
-    cleaned = re.sub(r'[岁年万千元]', '', value)
+    # 一次移除中文单位（岁、年、万元、千元、元等）、英文字符（years、$）以及逗号和空格
+    cleaned = _NON_NUMERIC_RE.sub('', value)
 
-    # 移除英文字符（years、$、comma等）
-    cleaned = re.sub(r'[years$]', '', cleaned, flags=re.IGNORECASE)
-
-    # 移除逗号和空格
-    cleaned = re.sub(r'[,\s]', '', cleaned)
-
-    # 处理特殊单位转换
-    if '万' in value and cleaned:
-        # 如果原字符串包含"万"，则乘以10000
-        numeric_value = float(cleaned) * 10000
-    elif '千' in value and cleaned:
-        # 如果原字符串包含"千"，则乘以1000
-        numeric_value = float(cleaned) * 1000
-    elif cleaned:
-        numeric_value = float(cleaned)
-    else:
+    if not cleaned:
         raise ValueError(f"无法从输入 '{value}' 中提取有效数字")
 
-    return numeric_value
+    # 处理特殊单位转换：原字符串包含"万"乘以10000，包含"千"乘以1000
+    multiplier = 10000 if '万' in value else 1000 if '千' in value else 1
+    return float(cleaned) * multiplier
 
 def calculate_risk_score(risk_scenario: str, risk_focus: str, knowledge_level: str) -> float:
     """
@@ -87,12 +95,10 @@ def calculate_risk_score(risk_scenario: str, risk_focus: str, knowledge_level: s
     Returns:
         float: 综合风险评分 (1-10分)
     """
-    from config import RISK_SCENARIO_MAPPING, RISK_FOCUS_MAPPING, KNOWLEDGE_LEVEL_MAPPING
-
     # 获取各维度评分
-    scenario_score = RISK_SCENARIO_MAPPING.get(risk_scenario, 5)
-    focus_score = RISK_FOCUS_MAPPING.get(risk_focus, 5)
-    knowledge_score = KNOWLEDGE_LEVEL_MAPPING.get(knowledge_level, 5)
+    scenario_score = Config.RISK_SCENARIO_MAPPING.get(risk_scenario, 5)
+    focus_score = Config.RISK_FOCUS_MAPPING.get(risk_focus, 5)
+    knowledge_score = Config.KNOWLEDGE_LEVEL_MAPPING.get(knowledge_level, 5)
 
     # 加权计算综合评分（风险场景权重最高，投资知识次之，风险关注点最低）
     risk_score = (scenario_score * 0.5 + focus_score * 0.2 + knowledge_score * 0.3)
@@ -102,6 +108,14 @@ def calculate_risk_score(risk_scenario: str, risk_focus: str, knowledge_level: s
 
     return round(risk_score, 2)
 
+# validate_user_data 的必填字段
+REQUIRED_USER_FIELDS = (
+    'age', 'annual_investment_amount', 'liquidity_demand',
+    'target_return_description', 'investment_horizon',
+    'risk_scenario_choice', 'risk_focus_choice', 'investment_knowledge_level'
+)
+_REQUIRED_USER_FIELD_SET = frozenset(REQUIRED_USER_FIELDS)
+
 def validate_user_data(user_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     验证和清洗用户输入数据
@@ -115,15 +129,9 @@ def validate_user_data(user_data: Dict[str, Any]) -> Dict[str, Any]:
     Raises:
         ValueError: 当必填字段缺失或数据格式不正确时
     """
-    required_fields = [
-        'age', 'annual_investment_amount', 'liquidity_demand',
-        'target_return_description', 'investment_horizon',
-        'risk_scenario_choice', 'risk_focus_choice', 'investment_knowledge_level'
-    ]
-
-    # 检查必填字段
-    missing_fields = [field for field in required_fields if field not in user_data]
-    if missing_fields:
+    # 检查必填字段（全部存在时只做一次集合判断，缺失时再按固定顺序列出缺失字段）
+    if not _REQUIRED_USER_FIELD_SET.issubset(user_data):
+        missing_fields = [field for field in REQUIRED_USER_FIELDS if field not in user_data]
         raise ValueError(f"缺少必填字段: {missing_fields}")
 
     try: